@@ -5,34 +5,115 @@ from __future__ import annotations
 import asyncio
 import contextlib
 from datetime import datetime, timedelta
-import json
 import logging
 
 import aiohttp
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+from homeassistant.util import dt as dt_util
 
-from .const import DEFAULT_SCAN_INTERVAL, DOMAIN, FEED_URL
+from .const import (
+    CONF_FETCH_DEADLINE,
+    CONF_MOUNTAINS,
+    CONF_PHASE_TIMINGS,
+    CONF_RANKING_SIZE,
+    CONF_STALE_WHILE_REVALIDATE,
+    DATA_HISTORY,
+    DEFAULT_FETCH_DEADLINE,
+    DEFAULT_PHASE_TIMINGS,
+    DEFAULT_RANKING_SIZE,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_WHILE_REVALIDATE,
+    DOMAIN,
+)
+from .entity import entry_device_info
+from .export import MtnPowderSnapshotView
+from .feed import (
+    BreakerState,
+    CircuitBreaker,
+    FeedClient,
+    FeedError,
+    FeedSnapshot,
+    RecordDiff,
+    RecordFilter,
+    diff_snapshots,
+    normalize_feed,
+    rank_resorts,
+    ranking_source,
+)
+from .profiling import CycleProfiler, PhaseTimer
+from .services import async_setup_services
+from .websocket_api import async_setup_websocket_api
 
 PLATFORMS = ["sensor", "weather"]
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class MtnPowderCoordinator(DataUpdateCoordinator):
+def get_mountains(entry: ConfigEntry) -> list[str]:
+    """Return the selected resorts, as edited in the options flow if they were."""
+    return list(entry.options.get(CONF_MOUNTAINS, entry.data.get(CONF_MOUNTAINS)) or [])
+
+
+def entry_title(mountains: list[str]) -> str:
+    """Return the title of an entry tracking the given resorts."""
+    return ", ".join(mountains)
+
+
+def has_rankings(mountains: list[str]) -> bool:
+    """Return True when the selection gets ranking sensors."""
+    # Rankings compare resorts, so a single resort entry gets none
+    return len(mountains) > 1 or "All" in mountains
+
+
+def _ranked_resorts(mountains: list[str]) -> frozenset[str] | None:
+    """Return the resorts to rank, or None for the whole feed."""
+    # Rankings cover the entry's resorts, or the whole feed for "All"
+    if not mountains or "All" in mountains:
+        return None
+    return frozenset(mountains)
+
+
+class MtnPowderCoordinator(DataUpdateCoordinator[FeedSnapshot | None]):
     """Coordinator for MtnPowder data updates."""
 
     def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry | None) -> None:
         """Initialize the coordinator."""
-        self.session = aiohttp.ClientSession()
-        self._last_etag = None
-        self._last_modified = None
-        self._last_data = None
-        self._last_update_date = None
-        self._updates_today = 0
-        self._no_updates_today = 0
+        options = config_entry.options if config_entry is not None else {}
+        self.stale_while_revalidate: bool = options.get(
+            CONF_STALE_WHILE_REVALIDATE, DEFAULT_STALE_WHILE_REVALIDATE
+        )
+        self.fetch_deadline: float = options.get(
+            CONF_FETCH_DEADLINE, DEFAULT_FETCH_DEADLINE
+        )
+        self.ranking_size: int = options.get(CONF_RANKING_SIZE, DEFAULT_RANKING_SIZE)
+        self.mountains: list[str] = (
+            get_mountains(config_entry) if config_entry is not None else []
+        )
+        self.ranked_resorts = _ranked_resorts(self.mountains)
+        self.rankings: dict[str, list[dict]] = {}
+        # Compiled once; records outside the watchlist are never indexed
+        self.record_filter = RecordFilter.from_options(options)
+        self.timer = PhaseTimer(options.get(CONF_PHASE_TIMINGS, DEFAULT_PHASE_TIMINGS))
+        self.profiler: CycleProfiler | None = None
+        self.last_profile: str | None = None
+        # The client decompresses the streamed body itself
+        self.session = aiohttp.ClientSession(auto_decompress=False)
+        self.client = FeedClient(
+            self.session, timeout=self.fetch_deadline, timer=self.timer
+        )
+        self.breaker = CircuitBreaker(base_delay=DEFAULT_SCAN_INTERVAL)
+        self.changes: dict[str, RecordDiff] = {}
+        self.last_fetch_success: datetime | None = None
+        self._revalidate_task: asyncio.Task | None = None
+        # Close callbacks of the live websocket subscriptions, called on unload
+        self.subscriptions: set[CALLBACK_TYPE] = set()
         super().__init__(
             hass,
             _LOGGER,
@@ -42,85 +123,184 @@ class MtnPowderCoordinator(DataUpdateCoordinator):
             config_entry=config_entry,
         )
 
-    async def _async_fetch(self):
-        # Check date for daily reset
-        current_date = datetime.now().date()
-        if self._last_update_date != current_date:
-            self._last_update_date = current_date
-            self._updates_today = 0
-            self._no_updates_today = 0
-        # First, check with HEAD request if data has changed
-        try:
-            async with self.session.head(
-                FEED_URL, timeout=aiohttp.ClientTimeout(total=10)
-            ) as resp:
-                if resp.status != 200:
-                    _LOGGER.error("HEAD request failed: %s", resp.status)
-                    self._no_updates_today += 1
-                    return self._last_data
-                etag = resp.headers.get("ETag")
-                last_modified = resp.headers.get("Last-Modified")
-                if (etag and etag == self._last_etag) or (
-                    last_modified and last_modified == self._last_modified
-                ):
-                    _LOGGER.debug("Data not changed, using cached data")
-                    self._no_updates_today += 1
-                    return self._last_data
-        except asyncio.CancelledError:
-            raise
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Error in HEAD request: %s", err)
-            self._no_updates_today += 1
-            return self._last_data
-
-        # Data has changed or first fetch, do full GET
-        self._updates_today += 1
-        try:
-            async with self.session.get(
-                FEED_URL, timeout=aiohttp.ClientTimeout(total=10)
-            ) as resp:
-                text = await resp.text()
-                # _LOGGER.debug("Response text: %s", text)
-                # Update cached headers
-                self._last_etag = resp.headers.get("ETag")
-                _LOGGER.debug("ETAG: %s", self._last_etag)
-                self._last_modified = resp.headers.get("Last-Modified")
-                _LOGGER.debug("Last-Modified: %s", self._last_modified)
-        except asyncio.CancelledError:
-            raise
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Error fetching feed: %s", err)
-            return self._last_data
+    @property
+    def stats(self) -> dict[str, int]:
+        """Return the daily update counters."""
+        return self.client.stats
 
-        try:
-            data = json.loads(text)
-        except json.JSONDecodeError as err:
-            _LOGGER.error("Error parsing JSON: %s", err)
-            return self._last_data
+    @callback
+    def async_set_mountains(self, mountains: list[str]) -> None:
+        """Switch the selected resorts without fetching the feed again."""
+        self.mountains = mountains
+        self.ranked_resorts = _ranked_resorts(mountains)
+        if self.data is None:
+            return
+        # Nothing changed in the records, don't send the last delta again
+        self.changes = {}
+        self.rankings = rank_resorts(
+            (
+                ranking_source(resort)
+                for resort in self.data.resorts.values()
+                if self.ranked_resorts is None or resort.name in self.ranked_resorts
+            ),
+            self.ranking_size,
+        )
+        self.async_update_listeners()
+
+    async def _async_fetch(self) -> FeedSnapshot | None:
+        if (
+            self.data is None
+            or self.config_entry is None
+            or not self.stale_while_revalidate
+        ):
+            return await self.async_fetch_snapshot()
+
+        # Serve the last snapshot right away and revalidate in the background
+        self.changes = {}
+        if self._revalidate_task is None or self._revalidate_task.done():
+            # Tied to the entry so an unload cancels a revalidation in flight
+            self._revalidate_task = self.config_entry.async_create_background_task(
+                self.hass, self._async_revalidate(), f"{DOMAIN} revalidate"
+            )
+        return self.data
+
+    async def _async_revalidate(self) -> None:
+        """Fetch in the background and publish the snapshot if it changed."""
+        previous = self.data
+        snapshot = await self.async_fetch_snapshot()
+        if snapshot is not previous:
+            self.async_set_updated_data(snapshot)
+        else:
+            # Entities rendered from the stale fan-out before this fetch; the
+            # data age and daily stats still move, record sensors skip cheaply
+            self.async_update_listeners()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners and close the refresh cycle."""
+        with self.timer.phase("fan_out"):
+            super().async_update_listeners()
+        task = self._revalidate_task
+        if task is None or task.done() or task is asyncio.current_task():
+            self._async_end_cycle()
+        # Otherwise this is the stale fan-out and the revalidation ends the cycle
+
+    @callback
+    def _async_end_cycle(self) -> None:
+        """Log the phase timings and finish a profiled cycle."""
+        if timings := self.timer.end_cycle():
+            _LOGGER.debug(
+                "Refresh phases: %s",
+                ", ".join(
+                    f"{name} {secs * 1000:.1f}ms" for name, secs in timings.items()
+                ),
+            )
+        if self.profiler is None or not self.profiler.end_cycle():
+            return
+        profiler, self.profiler = self.profiler, None
+        self.hass.async_create_background_task(
+            self._async_dump_profile(profiler), f"{DOMAIN} dump profile"
+        )
 
-        # Process data to create dict of mountain -> resort data
-        # mountains = self.config_entry.data.get("mountains", [])
+    async def _async_dump_profile(self, profiler: CycleProfiler) -> None:
+        """Write a finished profile to the config directory."""
+        await self.hass.async_add_executor_job(profiler.dump)
+        self.last_profile = profiler.path
+        _LOGGER.info(
+            "Wrote profile of %d refresh cycles to %s", profiler.cycles, profiler.path
+        )
+
+    @callback
+    def async_start_profile(self, cycles: int) -> str:
+        """Profile the next refresh cycles and return the stats file path."""
+        if self.profiler is not None:
+            raise ValueError("A profile is already being recorded")
+        stamp = dt_util.utcnow().strftime("%Y%m%d%H%M%S")
+        self.profiler = CycleProfiler(
+            cycles, self.hass.config.path(f"{DOMAIN}_profile_{stamp}.prof")
+        )
+        return self.profiler.path
 
-        stats = {
-            "updates_today": self._updates_today,
-            "no_updates_today": self._no_updates_today,
-        }
+    async def async_fetch_snapshot(self) -> FeedSnapshot | None:
+        """Fetch the feed within the deadline and return the current snapshot.
 
-        # for resort in data.get("Resorts", []):
-        #   name = resort.get("Name")
-        #   if name and name in mountains:
-        #        resort_copy = resort.copy()
-        #        resort_copy["stats"] = stats
-        #        result[name] = resort_copy
+        While the circuit breaker is open no request is made and the cached
+        snapshot is served unchanged, so entities stay available with their
+        last known state until the feed recovers.
+        """
+        self.changes = {}
+        breaker = self.breaker
+        if not breaker.allow():
+            _LOGGER.debug("Feed circuit open, serving cached data")
+            if self.data is None:
+                raise UpdateFailed(f"Feed unavailable: {breaker.last_error}")
+            return self.data
+        timer = self.timer
+        # The client starts the profiler once the body is in, so the network
+        # wait and the other tasks running meanwhile are not profiled
+        self.client.profiler = self.profiler
+        try:
+            async with asyncio.timeout(self.fetch_deadline):
+                with timer.phase("fetch"):
+                    result = await self.client.async_fetch()
+        except TimeoutError:
+            err = FeedError(f"Feed fetch exceeded {self.fetch_deadline}s deadline")
+        except FeedError as feed_err:
+            err = feed_err
+        else:
+            if self.profiler is not None:
+                try:
+                    self.profiler.start()
+                except ValueError as err:
+                    _LOGGER.error("Cannot start profiling: %s", err)
+                    self.profiler = None
+            if breaker.state is not BreakerState.CLOSED:
+                _LOGGER.info("Feed recovered after %d failures", breaker.failures)
+            breaker.record_success()
+            self.last_fetch_success = dt_util.utcnow()
+            if result is None:
+                _LOGGER.debug("Data not changed, using cached data")
+                return self.data
+            with timer.phase("normalize"):
+                snapshot = normalize_feed(
+                    result.data, result.digest, self.record_filter, self.client.pool
+                )
+            with timer.phase("diff"):
+                self.changes = diff_snapshots(self.data, snapshot)
+            with timer.phase("rankings"):
+                self.rankings = rank_resorts(
+                    result.data.get("Resorts") or [],
+                    self.ranking_size,
+                    self.ranked_resorts,
+                )
+            _LOGGER.debug("Feed changed for %d resorts", len(self.changes))
+            return snapshot
+
+        previous = breaker.state
+        breaker.record_failure(err)
+        # Only state changes are logged above debug to keep outages quiet
+        if breaker.state is BreakerState.OPEN and previous is BreakerState.CLOSED:
+            _LOGGER.warning(
+                "Feed unavailable (%s), backing off until %s",
+                err,
+                dt_util.utc_from_timestamp(breaker.next_attempt),
+            )
+        elif breaker.failures == 1:
+            _LOGGER.warning("Error fetching feed: %s", err)
+        else:
+            _LOGGER.debug("Feed still unavailable: %s", err)
 
-        # Cache the result
-        self._last_data = data
-        return data
+        if self.data is None:
+            raise UpdateFailed(str(err)) from err
+        return self.data
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the MtnPowder integration."""
     hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
+    hass.http.register_view(MtnPowderSnapshotView())
+    async_setup_websocket_api(hass)
     return True
 
 
@@ -131,15 +311,128 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # create coordinator per config entry and store by entry_id
     coordinator = MtnPowderCoordinator(hass, entry)
     await coordinator.async_config_entry_first_refresh()
-    hass.data[DOMAIN][entry.entry_id] = {
+    entry_data = hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
         "title": entry.title,
+        # Options that need a reload; the resort selection is applied in place
+        "options": _reload_options(entry),
+        # Per platform callbacks adding the entities of newly selected resorts
+        "add_resorts": {},
     }
 
+    # Parent of the resort devices created by the platforms
+    dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, **entry_device_info(entry)
+    )
+
+    if "recorder" in hass.config.components:
+        # Keep season long snow history in compact long-term statistics
+        from .statistics import SnowHistory  # pylint: disable=import-outside-toplevel
+
+        # The current hour stays buffered across reloads; writing it on unload
+        # would be overwritten by the samples taken after the reload
+        histories = hass.data.setdefault(DATA_HISTORY, {})
+        if (history := histories.get(entry.entry_id)) is None:
+            history = histories[entry.entry_id] = SnowHistory(
+                hass, coordinator.mountains
+            )
+        history.mountains = coordinator.mountains
+        entry_data["history"] = history
+        history.async_add_snapshot(coordinator.data)
+        entry.async_on_unload(
+            coordinator.async_add_listener(
+                lambda: history.async_add_snapshot(coordinator.data)
+            )
+        )
+        entry.async_on_unload(history.async_flush_completed)
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+def _reload_options(entry: ConfigEntry) -> tuple:
+    """Return the options whose change requires reloading the entry.
+
+    Defaults are filled in and the watchlist is compiled, so an entry that was
+    created without some options compares equal once the options flow stores
+    their defaults.
+    """
+    options = entry.options
+    return (
+        options.get(CONF_STALE_WHILE_REVALIDATE, DEFAULT_STALE_WHILE_REVALIDATE),
+        options.get(CONF_FETCH_DEADLINE, DEFAULT_FETCH_DEADLINE),
+        options.get(CONF_RANKING_SIZE, DEFAULT_RANKING_SIZE),
+        options.get(CONF_PHASE_TIMINGS, DEFAULT_PHASE_TIMINGS),
+        RecordFilter.from_options(options),
+    )
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply a new resort selection in place, reload for other option changes."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None:
+        return
+    coordinator: MtnPowderCoordinator = entry_data["coordinator"]
+    old = coordinator.mountains
+    new = get_mountains(entry)
+    options_changed = entry_data["options"] != _reload_options(entry)
+    # Keep the title in line with the selection unless the user renamed it
+    if old != new and entry.title in (entry_title(old), old):
+        hass.config_entries.async_update_entry(entry, title=entry_title(new))
+        entry_data["title"] = entry.title
+    # Ranking sensors come and go with the reload
+    if options_changed or has_rankings(old) != has_rankings(new):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    if old == new:
+        return
+
+    removed = [mountain for mountain in old if mountain not in new]
+    added = [mountain for mountain in new if mountain not in old]
+    _LOGGER.debug("Resorts added: %s, removed: %s", added, removed)
+    _async_remove_resorts(hass, entry, removed)
+    coordinator.async_set_mountains(new)
+    if history := entry_data.get("history"):
+        history.mountains = new
+    # Entities of the new resorts are built from the snapshot already loaded
+    for async_add_resorts in entry_data["add_resorts"].values():
+        async_add_resorts(added)
+
+
+@callback
+def _async_remove_resorts(
+    hass: HomeAssistant, entry: ConfigEntry, mountains: list[str]
+) -> None:
+    """Remove the entities and devices of resorts no longer selected."""
+    dev_reg = dr.async_get(hass)
+    ent_reg = er.async_get(hass)
+    for mountain in mountains:
+        device = dev_reg.async_get_device(identifiers={(DOMAIN, mountain)})
+        if device is None:
+            continue
+        for entity in er.async_entries_for_device(
+            ent_reg, device.id, include_disabled_entities=True
+        ):
+            if entity.config_entry_id == entry.entry_id:
+                ent_reg.async_remove(entity.entity_id)
+        # Devices shared with another entry are only detached from this one
+        dev_reg.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, entry: ConfigEntry, device: dr.DeviceEntry
+) -> bool:
+    """Allow removing devices of resorts that are no longer selected."""
+    mountains = get_mountains(entry)
+    return not any(
+        identifier[0] == DOMAIN
+        and (identifier[1] == entry.entry_id or identifier[1] in mountains)
+        for identifier in device.identifiers
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
@@ -148,6 +441,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         entry_data = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
         if entry_data:
             coord = entry_data.get("coordinator")
+            for async_close in list(coord.subscriptions):
+                async_close()
+            if coord.profiler is not None:
+                coord.profiler.stop()
             with contextlib.suppress(Exception):
                 await coord.session.close()
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Write the buffered snow history of a removed entry."""
+    if (
+        history := hass.data.get(DATA_HISTORY, {}).pop(entry.entry_id, None)
+    ) is not None:
+        history.async_flush()
@@ -7,10 +7,55 @@ import contextlib
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 
-from . import MtnPowderCoordinator
-from .const import DEFAULT_NAME, DOMAIN
+from . import MtnPowderCoordinator, entry_title, get_mountains
+from .const import (
+    CONF_AREAS,
+    CONF_CATEGORIES,
+    CONF_DIFFICULTIES,
+    CONF_EXCLUDE,
+    CONF_FETCH_DEADLINE,
+    CONF_INCLUDE,
+    CONF_MOUNTAINS,
+    CONF_PHASE_TIMINGS,
+    CONF_RANKING_SIZE,
+    CONF_STALE_WHILE_REVALIDATE,
+    DEFAULT_FETCH_DEADLINE,
+    DEFAULT_NAME,
+    DEFAULT_PHASE_TIMINGS,
+    DEFAULT_RANKING_SIZE,
+    DEFAULT_STALE_WHILE_REVALIDATE,
+    DOMAIN,
+)
+from .feed import RECORD_KINDS, split_patterns
+
+CATEGORY_CHOICES = {"trail": "Trails", "lift": "Lifts", "activity": "Activities"}
+
+# Free text watchlist options, stored as lists of patterns or names
+_LIST_OPTIONS = (CONF_INCLUDE, CONF_EXCLUDE, CONF_AREAS, CONF_DIFFICULTIES)
+
+
+def _watchlist_schema(options) -> dict:
+    """Return the schema fields selecting which records become entities."""
+    categories = options.get(CONF_CATEGORIES, list(RECORD_KINDS))
+    return {
+        **{
+            vol.Optional(key, default=", ".join(options.get(key, []))): str
+            for key in _LIST_OPTIONS
+        },
+        vol.Optional(CONF_CATEGORIES, default=categories): cv.multi_select(
+            CATEGORY_CHOICES
+        ),
+    }
+
+
+def _watchlist_options(user_input) -> dict:
+    """Return the watchlist options of a submitted form."""
+    options = {key: split_patterns(user_input.get(key)) for key in _LIST_OPTIONS}
+    options[CONF_CATEGORIES] = list(user_input.get(CONF_CATEGORIES, RECORD_KINDS))
+    return options
 
 
 class MtnPowderFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -18,6 +63,12 @@ class MtnPowderFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for this handler."""
+        return MtnPowderOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step where we let the user choose a mountain."""
         if user_input is None:
@@ -31,23 +82,71 @@ class MtnPowderFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 with contextlib.suppress(Exception):
                     await coordinator.session.close()
 
-            choices = []
-            if feed and isinstance(feed, dict) and "Resorts" in feed:
-                for resort in feed["Resorts"]:
-                    name = resort.get("Name")
-                    if name and name not in choices:
-                        choices.append(name)
+            choices = list(feed.resorts) if feed is not None else []
 
             if not choices:
                 choices = ["All"]
 
             schema = vol.Schema(
                 {
-                    vol.Required("mountains"): cv.multi_select(choices),
+                    vol.Required(CONF_MOUNTAINS): cv.multi_select(choices),
+                    **_watchlist_schema({}),
                 }
             )
             return self.async_show_form(step_id="user", data_schema=schema)
 
-        mountains = user_input.get("mountains", "None")
+        mountains = user_input.get(CONF_MOUNTAINS, "None")
+
+        return self.async_create_entry(
+            title=entry_title(mountains),
+            data={CONF_MOUNTAINS: mountains},
+            options=_watchlist_options(user_input),
+        )
+
+
+class MtnPowderOptionsFlow(config_entries.OptionsFlow):
+    """Handle MtnPowder options."""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the resorts, refresh behaviour and the watchlist."""
+        if user_input is not None:
+            return self.async_create_entry(
+                data={**user_input, **_watchlist_options(user_input)}
+            )
 
-        return self.async_create_entry(title=mountains, data={"mountains": mountains})
+        options = self.config_entry.options
+        mountains = get_mountains(self.config_entry)
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id)
+        coordinator = entry_data.get("coordinator") if entry_data else None
+        choices = (
+            list(coordinator.data.resorts) if coordinator and coordinator.data else []
+        )
+        # Keep the current selection selectable even if it left the feed
+        choices += [mountain for mountain in mountains if mountain not in choices]
+        schema = vol.Schema(
+            {
+                vol.Required(CONF_MOUNTAINS, default=mountains): cv.multi_select(
+                    choices
+                ),
+                vol.Optional(
+                    CONF_STALE_WHILE_REVALIDATE,
+                    default=options.get(
+                        CONF_STALE_WHILE_REVALIDATE, DEFAULT_STALE_WHILE_REVALIDATE
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_FETCH_DEADLINE,
+                    default=options.get(CONF_FETCH_DEADLINE, DEFAULT_FETCH_DEADLINE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
+                vol.Optional(
+                    CONF_RANKING_SIZE,
+                    default=options.get(CONF_RANKING_SIZE, DEFAULT_RANKING_SIZE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+                vol.Optional(
+                    CONF_PHASE_TIMINGS,
+                    default=options.get(CONF_PHASE_TIMINGS, DEFAULT_PHASE_TIMINGS),
+                ): bool,
+                **_watchlist_schema(options),
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema)
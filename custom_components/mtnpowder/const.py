@@ -5,3 +5,30 @@ DEFAULT_NAME = "MtnPowder"
 DEFAULT_SCAN_INTERVAL = 300
 FEED_URL = "https://mtnpowder.com/feed/"
 
+
+CONF_STALE_WHILE_REVALIDATE = "stale_while_revalidate"
+CONF_FETCH_DEADLINE = "fetch_deadline"
+DEFAULT_STALE_WHILE_REVALIDATE = True
+DEFAULT_FETCH_DEADLINE = 30
+
+# Watchlist options limiting which trails, lifts and activities are indexed
+CONF_INCLUDE = "include"
+CONF_EXCLUDE = "exclude"
+CONF_AREAS = "areas"
+CONF_DIFFICULTIES = "difficulties"
+CONF_CATEGORIES = "categories"
+
+# Number of resorts kept by each ranking sensor
+CONF_RANKING_SIZE = "ranking_size"
+DEFAULT_RANKING_SIZE = 5
+
+# Always-on per-phase refresh timings
+CONF_PHASE_TIMINGS = "phase_timings"
+DEFAULT_PHASE_TIMINGS = True
+
+# Selected resorts; options take precedence over the data of the entry
+CONF_MOUNTAINS = "mountains"
+
+# Snow history per entry id, kept across reloads so partial hours survive
+DATA_HISTORY = f"{DOMAIN}_history"
+MANUFACTURER = "Alterra Mountain Company"
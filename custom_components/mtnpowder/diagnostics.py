@@ -0,0 +1,43 @@
+"""Diagnostics support for the MtnPowder integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    snapshot = coordinator.data
+    last_fetch_success = coordinator.last_fetch_success
+    return {
+        "data": dict(entry.data),
+        "options": dict(entry.options),
+        "breaker": coordinator.breaker.as_dict(),
+        "last_fetch_success": (
+            last_fetch_success.isoformat() if last_fetch_success else None
+        ),
+        "validators": {
+            "etag": coordinator.client.etag,
+            "last_modified": coordinator.client.last_modified,
+        },
+        "stats": coordinator.stats,
+        "phase_timings": coordinator.timer.as_dict(),
+        "last_profile": coordinator.last_profile,
+        "snapshot": (
+            {
+                "version": snapshot.version,
+                "last_update": snapshot.last_update,
+                "resorts": len(snapshot.resorts),
+            }
+            if snapshot is not None
+            else None
+        ),
+    }
@@ -0,0 +1,75 @@
+"""Per-resort views and base entity for the MtnPowder integration."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DEFAULT_NAME, DOMAIN, MANUFACTURER
+from .feed import ResortRecord
+
+if TYPE_CHECKING:
+    from . import MtnPowderCoordinator
+
+
+def entry_device_info(entry: ConfigEntry) -> DeviceInfo:
+    """Return the device of a config entry, parent of its resort devices."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name=DEFAULT_NAME,
+        manufacturer=MANUFACTURER,
+        entry_type=DeviceEntryType.SERVICE,
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class ResortView:
+    """Lightweight view of one resort on the shared coordinator snapshot.
+
+    The feed is fetched and parsed once per entry; views only look up their
+    resort, so resorts can be added or removed without touching the others.
+    """
+
+    coordinator: MtnPowderCoordinator
+    name: str
+
+    @property
+    def resort(self) -> ResortRecord | None:
+        """Return the resort in the current snapshot."""
+        if (snapshot := self.coordinator.data) is None:
+            return None
+        return snapshot.resorts.get(self.name)
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device grouping the resort's entities."""
+        info = DeviceInfo(
+            identifiers={(DOMAIN, self.name)},
+            name=self.name,
+            manufacturer=MANUFACTURER,
+            model="Resort",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+        if (entry := self.coordinator.config_entry) is not None:
+            info["via_device"] = (DOMAIN, entry.entry_id)
+        return info
+
+
+class MtnPowderResortEntity(CoordinatorEntity):
+    """Entity reading one resort through its view."""
+
+    def __init__(self, view: ResortView) -> None:
+        """Initialize the entity."""
+        super().__init__(view.coordinator)
+        self.view = view
+        self._mountain = view.name
+        self._attr_device_info = view.device_info
+
+    @property
+    def available(self):
+        """Return if the entity is available."""
+        return self.coordinator.data is not None
@@ -0,0 +1,145 @@
+"""Bulk export of the normalized MtnPowder snapshot."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+import hashlib
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from homeassistant.const import CONTENT_TYPE_JSON
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.http import KEY_HASS, HomeAssistantView
+from homeassistant.helpers.json import json_bytes
+
+from .const import DOMAIN
+from .feed import ResortRecord, resort_tree
+
+if TYPE_CHECKING:
+    from . import MtnPowderCoordinator
+
+EXPORT_FORMATS = ("json", "ndjson")
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
+
+
+@dataclass(slots=True)
+class SnapshotExport:
+    """The resorts selected from a snapshot and the ETag of their export."""
+
+    etag: str
+    version: str | None
+    resorts: list[ResortRecord]
+
+
+@callback
+def async_get_coordinator(
+    hass: HomeAssistant, entry_id: str | None = None
+) -> MtnPowderCoordinator | None:
+    """Return the coordinator of the given entry, or of the first loaded one."""
+    entries = hass.data.get(DOMAIN, {})
+    if entry_id is not None:
+        entry_data = entries.get(entry_id)
+    else:
+        entry_data = next(iter(entries.values()), None)
+    if not entry_data:
+        return None
+    return entry_data.get("coordinator")
+
+
+def snapshot_etag(version: str | None, resorts: list[str], fmt: str) -> str:
+    """Return a strong ETag for an export of the given resorts."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{version}\0{fmt}".encode())
+    for name in resorts:
+        digest.update(b"\0" + name.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def build_export(
+    coordinator: MtnPowderCoordinator, resorts: list[str] | None, fmt: str
+) -> SnapshotExport:
+    """Select resorts from the coordinator snapshot for export.
+
+    Without an explicit selection the resorts chosen for the config entry are
+    exported; "All" selects every resort in the feed.
+    """
+    snapshot = coordinator.data
+    if not resorts:
+        resorts = coordinator.mountains
+    if not resorts or "All" in resorts:
+        resorts = list(snapshot.resorts)
+    selected = [
+        snapshot.resorts[name]
+        for name in dict.fromkeys(resorts)
+        if name in snapshot.resorts
+    ]
+    etag = snapshot_etag(snapshot.version, [resort.name for resort in selected], fmt)
+    return SnapshotExport(etag, snapshot.version, selected)
+
+
+def encode_json(export: SnapshotExport) -> bytes:
+    """Encode an export as a single compact JSON document."""
+    return json_bytes(
+        {
+            "version": export.version,
+            "resorts": [resort_tree(resort) for resort in export.resorts],
+        }
+    )
+
+
+def iter_ndjson(export: SnapshotExport) -> Iterator[bytes]:
+    """Encode an export as one JSON line per resort."""
+    for resort in export.resorts:
+        yield json_bytes(resort_tree(resort)) + b"\n"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Return True when an If-None-Match header matches the ETag."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class MtnPowderSnapshotView(HomeAssistantView):
+    """Serve the normalized snapshot of selected resorts in one response.
+
+    Query parameters: ``resort`` (repeatable), ``format`` (json or ndjson) and
+    ``entry_id``. Requests sending a matching If-None-Match get a 304.
+    """
+
+    url = "/api/mtnpowder/snapshot"
+    name = "api:mtnpowder:snapshot"
+
+    async def get(self, request: web.Request) -> web.StreamResponse:
+        """Return the snapshot export."""
+        hass = request.app[KEY_HASS]
+        fmt = request.query.get("format", "json")
+        if fmt not in EXPORT_FORMATS:
+            return self.json_message(f"Unknown format {fmt}", HTTPStatus.BAD_REQUEST)
+        coordinator = async_get_coordinator(hass, request.query.get("entry_id"))
+        if coordinator is None or coordinator.data is None:
+            return self.json_message("No MtnPowder data", HTTPStatus.NOT_FOUND)
+
+        export = build_export(coordinator, request.query.getall("resort", []), fmt)
+        headers = {"ETag": export.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("If-None-Match"), export.etag):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        if fmt == "json":
+            return web.Response(
+                body=encode_json(export),
+                content_type=CONTENT_TYPE_JSON,
+                headers=headers,
+            )
+
+        response = web.StreamResponse(headers=headers)
+        response.content_type = CONTENT_TYPE_NDJSON
+        await response.prepare(request)
+        for line in iter_ndjson(export):
+            await response.write(line)
+        await response.write_eof()
+        return response
@@ -0,0 +1,1026 @@
+"""Home Assistant independent client and parser for the MtnPowder feed.
+
+Everything in this module only depends on the standard library, aiohttp and
+optionally brotli, so the fetch, parse and extraction steps can be unit tested,
+profiled and benchmarked without a running Home Assistant instance.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Container, Iterable, Mapping
+import contextlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from enum import StrEnum
+import fnmatch
+import hashlib
+import heapq
+import json
+import logging
+import random
+import re
+import time
+from typing import Any
+import zlib
+
+import aiohttp
+
+from .const import (
+    CONF_AREAS,
+    CONF_CATEGORIES,
+    CONF_DIFFICULTIES,
+    CONF_EXCLUDE,
+    CONF_INCLUDE,
+    FEED_URL,
+)
+from .profiling import CycleProfiler, PhaseTimer
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_STATE_LENGTH = 255
+
+# Daily counters kept by the client
+CLIENT_STATS = (
+    "updates_today",
+    "no_updates_today",
+    "requests_today",
+    "bytes_received_today",
+    "bytes_decompressed_today",
+)
+
+ACCEPT_ENCODING = "br, gzip" if brotli is not None else "gzip"
+CHUNK_SIZE = 64 * 1024
+
+# Low-cardinality fields repeat across records and snapshots ("Open", "Easy",
+# "--", "false", names) and share one copy through a ValuePool. Timestamps and
+# free text change every refresh and are never pooled.
+POOLED_KEYS = frozenset(
+    {
+        "BaseConditions",
+        "Difficulty",
+        "Glades",
+        "Grooming",
+        "GroomingActive",
+        "LiftType",
+        "Moguls",
+        "Name",
+        "NightSkiing",
+        "OperatingStatus",
+        "Skies",
+        "SnowMaking",
+        "SnowMakingActive",
+        "Status",
+        "StatusEnglish",
+        "TerrainParkOnRun",
+        "Touring",
+        "Type",
+        "WindDirection",
+    }
+)
+VALUE_POOL_SIZE = 16384
+
+# Index keys mirror the sensor type tuples, e.g. ("trail", area, name).
+RecordKey = tuple[str, ...]
+
+RECORD_KINDS = ("trail", "lift", "activity")
+
+_RECORD_LISTS = {"trail": "Trails", "lift": "Lifts", "activity": "Activities"}
+
+_TRAIL_ATTRIBUTES = {
+    "difficulty": "Difficulty",
+    "snow_making": "SnowMaking",
+    "grooming": "Grooming",
+    "night_skiing": "NightSkiing",
+    "moguls": "Moguls",
+    "glades": "Glades",
+    "touring": "Touring",
+    "nordic": "Nordic",
+    "terrain_park_on_run": "TerrainParkOnRun",
+    "run_of_the_day": "RunOfTheDay",
+    "trail_summary": "TrailSummary",
+    "terrain_park_features": "TerrainParkFeatures",
+    "update_date": "UpdateDate",
+}
+
+_STATUS_KEYS = ("Status", "StatusEnglish", "Id")
+
+_CONDITION_EXCLUDED_KEYS = frozenset(
+    (
+        "Name",
+        "Icon",
+        "IconFADefault",
+        "TemperatureF",
+        "TemperatureC",
+        "TemperatureLowF",
+        "TemperatureHighF",
+        "TemperatureLowC",
+        "TemperatureHighC",
+        "PressureIN",
+        "PressureMB",
+        "WindDirection",
+        "WindStrengthMph",
+        "WindStrengthKph",
+        "HumidityC",
+        "HumidityF",
+        "DewPointC",
+        "DewPointF",
+        "Conditions",
+    )
+)
+
+_DIRECTIONS = {
+    "N": 0,
+    "NNE": 22,
+    "NE": 45,
+    "ENE": 67,
+    "E": 90,
+    "ESE": 112,
+    "SE": 135,
+    "SSE": 157,
+    "S": 180,
+    "SSW": 202,
+    "SW": 225,
+    "WSW": 247,
+    "W": 270,
+    "WNW": 292,
+    "NW": 315,
+    "NNW": 337,
+}
+
+_CONDITIONS = {
+    "clear": "sunny",
+    "cloudy": "cloudy",
+    "fog": "fog",
+    "hail": "hail",
+    "lightning": "lightning",
+    "rainy": "rainy",
+    "snowy": "snowy",
+    "windy": "windy",
+    "partly cloudy": "partly-cloudy",
+    # Add more if needed
+}
+
+# Cross-resort rankings: new snow and open terrain rank the largest values
+# first, the coldest summit the lowest temperature.
+RANKINGS = ("new_snow", "open_terrain", "coldest_summit")
+
+_FORECAST_DAYS = ("OneDay", "TwoDay", "ThreeDay", "FourDay", "FiveDay")
+
+
+class FeedError(Exception):
+    """Raised when the feed cannot be fetched or decoded.
+
+    ``status`` is the HTTP status of a failed request and ``retry_after`` the
+    delay in seconds the server asked for, when it sent one.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: int | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        """Initialize the error."""
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class BreakerState(StrEnum):
+    """State of the fetch circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker with exponential backoff and jitter for the fetch path.
+
+    The breaker opens after ``failure_threshold`` consecutive failures, or at
+    once when the server sends Retry-After. While open no request is made until
+    the backoff delay has passed; the next attempt is then allowed through in
+    the half-open state and either closes the breaker or opens it again with a
+    doubled delay. Each delay is lengthened by up to as much again in random
+    jitter. The clock and random source can be injected for tests.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_delay: float = 300,
+        max_delay: float = 3600,
+        clock: Callable[[], float] = time.time,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """Initialize the breaker."""
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._rng = rng
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.next_attempt: float | None = None
+        self.last_error: str | None = None
+
+    def allow(self) -> bool:
+        """Return True when a request may be made now."""
+        if self.state is not BreakerState.OPEN:
+            return True
+        if self.next_attempt is not None and self._clock() < self.next_attempt:
+            return False
+        self.state = BreakerState.HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.next_attempt = None
+        self.last_error = None
+
+    def record_failure(self, err: Exception) -> None:
+        """Count a failed request and open the breaker when needed."""
+        self.failures += 1
+        self.last_error = str(err)
+        retry_after = getattr(err, "retry_after", None)
+        if (
+            self.state is BreakerState.CLOSED
+            and self.failures < self.failure_threshold
+            and retry_after is None
+        ):
+            return
+        # Jitter is added on top of the delay so entries sharing an outage do
+        # not all come back at the same moment, and a base delay equal to the
+        # poll interval always skips at least the next poll.
+        delay = min(self.max_delay, self.base_delay * 2**self.opened)
+        delay += self._rng() * delay
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        self.state = BreakerState.OPEN
+        self.opened += 1
+        self.next_attempt = self._clock() + delay
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker state for diagnostics."""
+        next_attempt = None
+        if self.next_attempt is not None and self.state is BreakerState.OPEN:
+            next_attempt = datetime.fromtimestamp(
+                self.next_attempt, timezone.utc
+            ).isoformat()
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "next_attempt": next_attempt,
+            "last_error": self.last_error,
+        }
+
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """Return the delay in seconds of a Retry-After header.
+
+    The header is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+def _status_error(method: str, resp: aiohttp.ClientResponse) -> FeedError:
+    """Return the error for a request that did not return 200."""
+    return FeedError(
+        f"{method} request failed: {resp.status}",
+        resp.status,
+        parse_retry_after(resp.headers.get("Retry-After")),
+    )
+
+
+@dataclass(slots=True)
+class FetchResult:
+    """A decoded feed body together with its cache validators."""
+
+    data: dict[str, Any]
+    etag: str | None = None
+    last_modified: str | None = None
+    digest: str | None = None
+
+
+@dataclass(slots=True)
+class ResortRecord:
+    """Normalized view of a single resort, indexed by record key."""
+
+    name: str
+    records: dict[RecordKey, dict[str, Any]] = field(default_factory=dict)
+    # Content fingerprint of every record, computed once while parsing
+    fingerprints: dict[RecordKey, bytes] = field(default_factory=dict)
+
+    def get(self, key: RecordKey) -> dict[str, Any] | None:
+        """Return the record stored under key, if any."""
+        return self.records.get(key)
+
+    def fingerprint(self, key: RecordKey) -> bytes | None:
+        """Return the content fingerprint of the record stored under key."""
+        return self.fingerprints.get(key)
+
+    def keys(self, kind: str) -> list[RecordKey]:
+        """Return the record keys of the given kind in feed order."""
+        return [key for key in self.records if key[0] == kind]
+
+
+def split_patterns(value: str | list[str] | None) -> list[str]:
+    """Return the entries of a comma or newline separated option value."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = re.split(r"[,\n]", value)
+    return [entry.strip() for entry in value if entry and entry.strip()]
+
+
+def _compile_patterns(patterns: list[str]) -> re.Pattern[str] | None:
+    """Compile shell style patterns into one case-insensitive regex."""
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class RecordFilter:
+    """Watchlist deciding which trails, lifts and activities are indexed.
+
+    Include and exclude patterns are shell style globs matched case-insensitively
+    against the record name and against ``area/name``. The area filter also
+    drops the area records themselves, and the difficulty filter only applies
+    to trails. Empty criteria match everything.
+    """
+
+    include: re.Pattern[str] | None = None
+    exclude: re.Pattern[str] | None = None
+    areas: frozenset[str] = frozenset()
+    difficulties: frozenset[str] = frozenset()
+    categories: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_options(cls, options: Mapping[str, Any]) -> RecordFilter | None:
+        """Compile the watchlist options, or return None when none are set."""
+        categories = frozenset(split_patterns(options.get(CONF_CATEGORIES)))
+        if categories >= frozenset(RECORD_KINDS):
+            categories = frozenset()
+        record_filter = cls(
+            _compile_patterns(split_patterns(options.get(CONF_INCLUDE))),
+            _compile_patterns(split_patterns(options.get(CONF_EXCLUDE))),
+            frozenset(
+                area.casefold() for area in split_patterns(options.get(CONF_AREAS))
+            ),
+            frozenset(
+                difficulty.casefold()
+                for difficulty in split_patterns(options.get(CONF_DIFFICULTIES))
+            ),
+            categories,
+        )
+        return record_filter if record_filter != cls() else None
+
+    def digest(self) -> str:
+        """Return a digest identifying the watchlist, stable across restarts."""
+        parts = (
+            self.include.pattern if self.include is not None else "",
+            self.exclude.pattern if self.exclude is not None else "",
+            *(
+                ",".join(sorted(values))
+                for values in (self.areas, self.difficulties, self.categories)
+            ),
+        )
+        return hashlib.blake2b("\n".join(parts).encode(), digest_size=8).hexdigest()
+
+    def matches_area(self, area: str) -> bool:
+        """Return True when an area and its records should be indexed."""
+        return not self.areas or area.casefold() in self.areas
+
+    def matches(self, kind: str, area: str, item: Mapping[str, Any]) -> bool:
+        """Return True when a record should be indexed."""
+        if self.categories and kind not in self.categories:
+            return False
+        if not self.matches_area(area):
+            return False
+        if (
+            self.difficulties
+            and kind == "trail"
+            and str(item.get("Difficulty", "")).casefold() not in self.difficulties
+        ):
+            return False
+        if self.include is None and self.exclude is None:
+            return True
+        name = item["Name"]
+        path = f"{area}/{name}"
+        if self.include is not None and not (
+            self.include.match(name) or self.include.match(path)
+        ):
+            return False
+        return self.exclude is None or not (
+            self.exclude.match(name) or self.exclude.match(path)
+        )
+
+
+@dataclass(slots=True)
+class FeedSnapshot:
+    """Normalized feed, indexed by resort name."""
+
+    last_update: str | None
+    resorts: dict[str, ResortRecord] = field(default_factory=dict)
+    # Content digest of the feed body and watchlist, used to version exports
+    version: str | None = None
+
+
+@dataclass(slots=True)
+class RecordDiff:
+    """Record keys that were added, changed or removed between snapshots."""
+
+    added: set[RecordKey] = field(default_factory=set)
+    changed: set[RecordKey] = field(default_factory=set)
+    removed: set[RecordKey] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        """Return True when anything differs."""
+        return bool(self.added or self.changed or self.removed)
+
+
+class _StreamDecoder:
+    """Incremental decoder for a Content-Encoding."""
+
+    def __init__(self, encoding: str) -> None:
+        if encoding in ("gzip", "x-gzip"):
+            self._decompress = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+        elif encoding == "deflate":
+            self._decompress = zlib.decompressobj().decompress
+        elif encoding == "br" and brotli is not None:
+            decompressor = brotli.Decompressor()
+            # Brotli calls it process, brotlicffi decompress
+            self._decompress = getattr(decompressor, "process", None) or (
+                decompressor.decompress
+            )
+        else:
+            raise FeedError(f"Unsupported Content-Encoding: {encoding}")
+
+    def decompress(self, chunk: bytes) -> bytes:
+        try:
+            return self._decompress(chunk)
+        except Exception as err:  # zlib.error and brotli.error share no base
+            raise FeedError(f"Error decompressing feed: {err}") from err
+
+
+class FeedClient:
+    """Conditional fetcher for the MtnPowder feed.
+
+    A HEAD request compares the ETag/Last-Modified validators of the last
+    successful download before the full body is requested. The body is
+    requested compressed and decompressed chunk by chunk while it streams in,
+    so the session must be created with ``auto_decompress=False``.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        url: str = FEED_URL,
+        timeout: float = 10,
+        timer: PhaseTimer | None = None,
+    ) -> None:
+        """Initialize the client."""
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.timer = timer or PhaseTimer(enabled=False)
+        # Shares repeated values between the snapshots built from this feed
+        self.pool = ValuePool()
+        # Profiler of the current refresh cycle, set by the coordinator
+        self.profiler: CycleProfiler | None = None
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self._stats_date: date | None = None
+        self._stats = dict.fromkeys(CLIENT_STATS, 0)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Return the daily request and bandwidth counters."""
+        self._roll_stats()
+        return dict(self._stats)
+
+    def _roll_stats(self) -> None:
+        """Reset the daily counters when the date changes."""
+        current_date = datetime.now().date()
+        if self._stats_date != current_date:
+            self._stats_date = current_date
+            self._stats = dict.fromkeys(CLIENT_STATS, 0)
+
+    async def async_fetch(self) -> FetchResult | None:
+        """Fetch and decode the feed, returning None when it is unchanged."""
+        self._roll_stats()
+        stats = self._stats
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        try:
+            stats["requests_today"] += 1
+            async with self.session.head(self.url, timeout=timeout) as resp:
+                if resp.status != 200:
+                    stats["no_updates_today"] += 1
+                    raise _status_error("HEAD", resp)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+                if (etag and etag == self.etag) or (
+                    last_modified and last_modified == self.last_modified
+                ):
+                    stats["no_updates_today"] += 1
+                    return None
+        except asyncio.CancelledError:
+            raise
+        except (aiohttp.ClientError, TimeoutError) as err:
+            stats["no_updates_today"] += 1
+            raise FeedError(f"Error in HEAD request: {err}") from err
+
+        # Data has changed or first fetch, do full GET
+        stats["updates_today"] += 1
+        try:
+            stats["requests_today"] += 1
+            async with self.session.get(
+                self.url,
+                timeout=timeout,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            ) as resp:
+                if resp.status != 200:
+                    raise _status_error("GET", resp)
+                body = await self._async_read_body(resp)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+        except asyncio.CancelledError:
+            raise
+        except (aiohttp.ClientError, TimeoutError) as err:
+            raise FeedError(f"Error fetching feed: {err}") from err
+
+        if self.profiler is not None:
+            # Profile from the decode on, not the network wait before it
+            with contextlib.suppress(ValueError):
+                self.profiler.start()
+        with self.timer.phase("decode"):
+            data = decode_feed(body)
+        # Only remember the validators once the body decoded, otherwise a
+        # broken download would be treated as current until the feed changes.
+        self.etag = etag
+        self.last_modified = last_modified
+        _LOGGER.debug("ETag: %s, Last-Modified: %s", etag, last_modified)
+        return FetchResult(data, etag, last_modified, body_digest(body))
+
+    async def _async_read_body(self, resp: aiohttp.ClientResponse) -> bytes:
+        """Read the body, decompressing chunks as they arrive."""
+        encoding = resp.headers.get("Content-Encoding", "identity").strip().lower()
+        decoder = None if encoding == "identity" else _StreamDecoder(encoding)
+        chunks = []
+        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+            self._stats["bytes_received_today"] += len(chunk)
+            chunks.append(decoder.decompress(chunk) if decoder else chunk)
+        body = b"".join(chunks)
+        self._stats["bytes_decompressed_today"] += len(body)
+        return body
+
+
+def decode_feed(text: str | bytes) -> dict[str, Any]:
+    """Decode a raw feed body."""
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, UnicodeDecodeError) as err:
+        raise FeedError(f"Error parsing JSON: {err}") from err
+    if not isinstance(data, dict):
+        raise FeedError("Feed is not a JSON object")
+    return data
+
+
+def body_digest(body: str | bytes) -> str:
+    """Return a short content digest of a feed body."""
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def fingerprint(record: Mapping[str, Any]) -> bytes:
+    """Return a content fingerprint of a record.
+
+    A digest of the canonical JSON rather than ``hash()``, which collides on
+    ordinary values (``-1`` and ``-2``, ``1`` and ``True``) and would hide a
+    change from the diff, the deltas and the entity update skip.
+    """
+    canonical = json.dumps(
+        record, sort_keys=True, separators=(",", ":"), default=str
+    ).encode()
+    return hashlib.blake2b(canonical, digest_size=16).digest()
+
+
+def _scalars(item: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the non-container values of a feed object."""
+    return {k: v for k, v in item.items() if not isinstance(v, (dict, list))}
+
+
+class ValuePool:
+    """Bounded pool sharing one copy of the values of low-cardinality fields.
+
+    Unlike ``sys.intern`` (immortal on Python 3.12) pooled strings are owned by
+    the pool, which stops taking new values once it holds ``max_size``.
+    """
+
+    __slots__ = ("_values", "max_size")
+
+    def __init__(self, max_size: int = VALUE_POOL_SIZE) -> None:
+        """Initialize an empty pool."""
+        self.max_size = max_size
+        self._values: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        """Return the number of pooled values."""
+        return len(self._values)
+
+    def share(self, item: dict[str, Any]) -> dict[str, Any]:
+        """Replace the pooled fields of a record in place with shared copies."""
+        values = self._values
+        for key, value in item.items():
+            if key not in POOLED_KEYS or type(value) is not str:
+                continue
+            if (shared := values.get(value)) is not None:
+                item[key] = shared
+            elif len(values) < self.max_size:
+                values[value] = value
+        return item
+
+
+def _keep(item: dict[str, Any]) -> dict[str, Any]:
+    """Return a record unchanged."""
+    return item
+
+
+def normalize_resort(
+    resort: dict[str, Any],
+    record_filter: RecordFilter | None = None,
+    pool: ValuePool | None = None,
+) -> ResortRecord:
+    """Index a raw resort object by record key.
+
+    Areas, trails, lifts and activities rejected by the filter are not indexed
+    at all. With a pool, low-cardinality values are shared in place before
+    indexing.
+    """
+    shared = _keep if pool is None else pool.share
+    record = ResortRecord(shared(resort)["Name"])
+    records = record.records
+    records[("resort",)] = _scalars(resort)
+    records[("snow_report",)] = shared(resort.get("SnowReport") or {})
+    for area in resort.get("MountainAreas") or []:
+        area_name = shared(area).get("Name")
+        if not area_name or not (
+            record_filter is None or record_filter.matches_area(area_name)
+        ):
+            continue
+        records[("area", area_name)] = _scalars(area)
+        for kind in RECORD_KINDS:
+            for item in area.get(_RECORD_LISTS[kind]) or []:
+                name = shared(item).get("Name")
+                if name and (
+                    record_filter is None
+                    or record_filter.matches(kind, area_name, item)
+                ):
+                    records[(kind, area_name, name)] = item
+    conditions = resort.get("CurrentConditions") or {}
+    if isinstance(conditions, dict):
+        for area_name, area_data in conditions.items():
+            if isinstance(area_data, dict):
+                records[("conditions", area_name)] = shared(area_data)
+    records[("forecast",)] = resort.get("Forecast") or {}
+    record.fingerprints = {key: fingerprint(value) for key, value in records.items()}
+    return record
+
+
+def normalize_feed(
+    data: Mapping[str, Any],
+    version: str | None = None,
+    record_filter: RecordFilter | None = None,
+    pool: ValuePool | None = None,
+) -> FeedSnapshot:
+    """Build an indexed snapshot from a decoded feed.
+
+    The decoded data is modified in place when a pool is given.
+    """
+    if version is not None and record_filter is not None:
+        # The same feed body holds other records under another watchlist
+        version = f"{version}-{record_filter.digest()}"
+    snapshot = FeedSnapshot(data.get("LastUpdate"), version=version)
+    for resort in data.get("Resorts") or []:
+        name = resort.get("Name")
+        if name and name not in snapshot.resorts:
+            record = normalize_resort(resort, record_filter, pool)
+            snapshot.resorts[record.name] = record
+    return snapshot
+
+
+def record_id(key: RecordKey) -> str:
+    """Return the string form of a record key used by exports."""
+    return "/".join(key)
+
+
+def resort_tree(resort: ResortRecord) -> dict[str, Any]:
+    """Return the JSON serializable normalized tree of a resort."""
+    return {
+        "name": resort.name,
+        "records": {record_id(key): value for key, value in resort.records.items()},
+    }
+
+
+def resort_delta(resort: ResortRecord | None, diff: RecordDiff) -> dict[str, Any]:
+    """Return the records of a resort touched by a diff, keyed by record id."""
+    records = resort.records if resort is not None else {}
+    return {
+        "changed": {
+            record_id(key): records[key]
+            for key in diff.added | diff.changed
+            if key in records
+        },
+        "removed": [record_id(key) for key in diff.removed],
+    }
+
+
+def diff_resort(old: ResortRecord | None, new: ResortRecord | None) -> RecordDiff:
+    """Compare two versions of a resort record by record fingerprint."""
+    diff = RecordDiff()
+    old_fingerprints = old.fingerprints if old is not None else {}
+    new_fingerprints = new.fingerprints if new is not None else {}
+    for key, value in new_fingerprints.items():
+        previous = old_fingerprints.get(key)
+        if previous is None:
+            diff.added.add(key)
+        elif previous != value:
+            diff.changed.add(key)
+    diff.removed.update(key for key in old_fingerprints if key not in new_fingerprints)
+    return diff
+
+
+def diff_snapshots(
+    old: FeedSnapshot | None, new: FeedSnapshot | None
+) -> dict[str, RecordDiff]:
+    """Return the per-resort differences between two snapshots."""
+    old_resorts = old.resorts if old is not None else {}
+    new_resorts = new.resorts if new is not None else {}
+    changes = {}
+    for name in new_resorts.keys() | old_resorts.keys():
+        diff = diff_resort(old_resorts.get(name), new_resorts.get(name))
+        if diff:
+            changes[name] = diff
+    return changes
+
+
+def _summit_temperature(conditions: Any) -> tuple[float, str] | None:
+    """Return the summit temperature, or that of the coldest station."""
+    if not isinstance(conditions, Mapping):
+        return None
+    summit = conditions.get("Summit")
+    stations = (
+        [("Summit", summit)] if isinstance(summit, Mapping) else conditions.items()
+    )
+    coldest = None
+    for station, data in stations:
+        if not isinstance(data, Mapping):
+            continue
+        temperature = parse_float(data.get("TemperatureC"))
+        if temperature is not None and (coldest is None or temperature < coldest[0]):
+            coldest = (temperature, station)
+    return coldest
+
+
+def ranking_source(resort: ResortRecord) -> dict[str, Any]:
+    """Return the feed fields rank_resorts reads, rebuilt from a resort."""
+    return {
+        "Name": resort.name,
+        "SnowReport": resort.get(("snow_report",)),
+        "CurrentConditions": {
+            key[1]: resort.get(key) for key in resort.keys("conditions")
+        },
+    }
+
+
+def _push_bounded(heap: list[tuple], k: int, item: tuple) -> None:
+    """Keep the k largest items in a min-heap."""
+    if len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def rank_resorts(
+    resorts: Iterable[Mapping[str, Any]],
+    k: int,
+    names: Container[str] | None = None,
+) -> dict[str, list[dict[str, Any]]]:
+    """Return the top k resorts of every ranking in one pass over the feed.
+
+    Each ranking keeps a bounded heap, so an update costs O(n log k) however
+    many resorts the feed lists. Only resorts in names are ranked when given.
+    """
+    heaps: dict[str, list[tuple]] = {ranking: [] for ranking in RANKINGS}
+    for index, resort in enumerate(resorts):
+        name = resort.get("Name")
+        if not name or (names is not None and name not in names):
+            continue
+        # Ties go to the resort listed first in the feed
+        order = -index
+        snow_report = resort.get("SnowReport") or {}
+        if (new_snow := parse_number(snow_report.get("StormTotalIn"))) is not None:
+            _push_bounded(heaps["new_snow"], k, (new_snow, order, name, None))
+        if (acres := parse_number(snow_report.get("OpenTerrainAcres"))) is not None:
+            _push_bounded(heaps["open_terrain"], k, (acres, order, name, None))
+        if summit := _summit_temperature(resort.get("CurrentConditions")):
+            # Negated so the bounded min-heap keeps the coldest resorts
+            _push_bounded(
+                heaps["coldest_summit"], k, (-summit[0], order, name, summit[1])
+            )
+
+    rankings = {}
+    for ranking, heap in heaps.items():
+        entries = []
+        for value, _, name, station in sorted(heap, reverse=True):
+            if station is None:
+                entries.append({"resort": name, "value": value})
+            else:
+                entries.append({"resort": name, "value": -value, "station": station})
+        rankings[ranking] = entries
+    return rankings
+
+
+def truncate_state(value: Any) -> Any:
+    """Shorten string states to the length Home Assistant accepts."""
+    if isinstance(value, str) and len(value) > MAX_STATE_LENGTH:
+        return value[: MAX_STATE_LENGTH - 3] + "..."
+    return value
+
+
+def parse_float(value: Any) -> float | None:
+    """Parse a numeric feed value, treating "--" and blanks as missing."""
+    if value is None or value in ("", "--"):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_int(value: Any) -> int | None:
+    """Parse an integer feed value, treating "--" and blanks as missing."""
+    if value is None or value in ("", "--"):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_timestamp(value: Any) -> datetime | None:
+    """Parse a feed timestamp such as "2025-11-24T17:42:17-0500"."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_number(value: Any) -> float | None:
+    """Parse a snow report number, using the lower bound of ranges like "18-24"."""
+    if isinstance(value, str):
+        head, _, _ = value.partition("-")
+        if head.strip():
+            value = head.strip()
+    return parse_float(value)
+
+
+def record_state(kind: str, record: Mapping[str, Any]) -> Any:
+    """Return the sensor state for an area, trail, lift or activity record."""
+    if kind == "area":
+        return record.get("OpenTrailsCount", 0)
+    return truncate_state(record.get("StatusEnglish", "unknown"))
+
+
+def record_attributes(kind: str, record: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the state attributes for an area, trail, lift or activity record."""
+    if kind == "area":
+        return {
+            "total_trails_count": record.get("TotalTrailsCount"),
+            "last_update": record.get("LastUpdate"),
+        }
+    if kind == "trail":
+        return {attr: record.get(key) for attr, key in _TRAIL_ATTRIBUTES.items()}
+    return {k: v for k, v in record.items() if k not in _STATUS_KEYS}
+
+
+def conditions_attributes(conditions: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the weather attributes not covered by weather entity properties."""
+    return {k: v for k, v in conditions.items() if k not in _CONDITION_EXCLUDED_KEYS}
+
+
+def direction_to_bearing(direction: str) -> int | None:
+    """Convert wind direction string to bearing in degrees."""
+    return _DIRECTIONS.get(direction.upper())
+
+
+def map_condition(condition: str) -> str | None:
+    """Map API condition to HA condition."""
+    return _CONDITIONS.get(condition.lower(), "sunny")
+
+
+def _snow_to_mm(value: str) -> float:
+    """Convert a forecast snowfall value such as "2-4" inches to millimetres."""
+    if "-" in value:
+        value = value.split("-")[0]
+    try:
+        return float(value) * 25.4 if value != "0" else 0.0
+    except ValueError:
+        return 0.0
+
+
+def build_forecast(
+    forecast: Mapping[str, Any], conditions: Mapping[str, Any] | None
+) -> list[dict[str, Any]] | None:
+    """Build twice daily forecasts from a resort forecast record."""
+    if not forecast:
+        return None
+    conditions = conditions or {}
+    # Get area's temp high/low in F
+    temp_high_f_area = conditions.get("TemperatureHighF")
+    temp_low_f_area = conditions.get("TemperatureLowF")
+    forecasts = []
+    for day_key in _FORECAST_DAYS:
+        day_data = forecast.get(day_key)
+        if not day_data:
+            continue
+        date_str = day_data.get("date")
+        if not date_str:
+            continue
+        try:
+            day = datetime.fromisoformat(date_str)
+        except ValueError:
+            continue
+        condition = map_condition(day_data.get("conditions", ""))
+        temp_high = day_data.get("temp_high_f")
+        temp_low = day_data.get("temp_low_f")
+        if temp_high == "--" or temp_low == "--":
+            continue
+        try:
+            if day_key == "OneDay" and temp_high_f_area is not None:
+                temp_high_f = temp_high_f_area
+                temp_low_f = temp_low_f_area
+            else:
+                temp_high_f = float(temp_high)
+                temp_low_f = float(temp_low)
+        except (TypeError, ValueError):
+            continue
+        # Daytime forecast
+        forecasts.append(
+            {
+                "datetime": day.replace(hour=12, minute=0, second=0, microsecond=0),
+                "condition": condition,
+                "temperature": temp_high_f,
+                "templow": temp_low_f,
+                "precipitation": _snow_to_mm(
+                    day_data.get("forecasted_snow_day_in", "0")
+                ),
+            }
+        )
+        # Nighttime forecast
+        forecasts.append(
+            {
+                "datetime": (day + timedelta(days=1)).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                ),
+                "condition": condition,
+                "temperature": temp_low_f,
+                "templow": temp_low_f,
+                "precipitation": _snow_to_mm(
+                    day_data.get("forecasted_snow_night_in", "0")
+                ),
+            }
+        )
+    return forecasts
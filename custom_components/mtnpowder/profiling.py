@@ -0,0 +1,119 @@
+"""Per-phase refresh timings and on-demand cProfile sessions.
+
+Like feed.py this module does not depend on Home Assistant, so the same
+instrumentation can be used by the benchmarks and the soak harness.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import cProfile
+from dataclasses import dataclass
+import time
+from typing import Any
+
+
+@dataclass(slots=True)
+class _PhaseStats:
+    """Running totals of one phase."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float = 0.0
+
+
+class PhaseTimer:
+    """Lightweight wall clock timer for the phases of a refresh cycle.
+
+    Phases may nest (``fetch`` includes ``decode``). When disabled, ``phase``
+    only costs a generator round trip.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        """Initialize the timer."""
+        self.enabled = enabled
+        self._phases: dict[str, _PhaseStats] = {}
+        self._cycle: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as the given phase."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = self._phases.get(name)
+            if stats is None:
+                stats = self._phases[name] = _PhaseStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.last = elapsed
+            self._cycle[name] = self._cycle.get(name, 0.0) + elapsed
+
+    def end_cycle(self) -> dict[str, float]:
+        """Return the phase durations of the cycle that just ended."""
+        cycle, self._cycle = self._cycle, {}
+        return cycle
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        """Return the phase statistics in milliseconds."""
+        return {
+            name: {
+                "count": stats.count,
+                "last_ms": round(stats.last * 1000, 3),
+                "mean_ms": round(stats.total / stats.count * 1000, 3),
+                "max_ms": round(stats.max * 1000, 3),
+            }
+            for name, stats in self._phases.items()
+        }
+
+
+class CycleProfiler:
+    """cProfile session covering a number of refresh cycles.
+
+    The profiler only runs between ``start`` and ``end_cycle``, so time spent
+    idle between refreshes does not dilute the statistics.
+    """
+
+    def __init__(self, cycles: int, path: str) -> None:
+        """Initialize the profiler."""
+        self.cycles = cycles
+        self.remaining = cycles
+        self.path = path
+        self.active = False
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        """Start profiling a cycle.
+
+        Raises ValueError when another profiler is already active.
+        """
+        if not self.active:
+            self._profile.enable()
+            self.active = True
+
+    def end_cycle(self) -> bool:
+        """Stop profiling the current cycle and return True once all are done."""
+        if not self.active:
+            return False
+        self._profile.disable()
+        self.active = False
+        self.remaining -= 1
+        return self.remaining <= 0
+
+    def stop(self) -> None:
+        """Stop profiling without finishing the cycle."""
+        if self.active:
+            self._profile.disable()
+            self.active = False
+
+    def dump(self) -> None:
+        """Write the collected statistics; does blocking I/O."""
+        self._profile.dump_stats(self.path)
@@ -2,22 +2,131 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable
 import logging
 import re
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTemperature,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
 )
+from homeassistant.util import dt as dt_util
 
+from . import get_mountains, has_rankings
 from .const import DEFAULT_NAME, DOMAIN
+from .entity import MtnPowderResortEntity, ResortView, entry_device_info
+from .feed import (
+    CLIENT_STATS,
+    RANKINGS,
+    RECORD_KINDS,
+    ResortRecord,
+    parse_number,
+    parse_timestamp,
+    record_attributes,
+    record_state,
+    truncate_state,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# SnowReport keys that are simple values (not dict or list)
+SNOW_REPORT_KEYS = (
+    "BaseConditions",
+    "Report",
+    "AdditionalText",
+    "News",
+    "Alert",
+    "StormRadar",
+    "StormRadarButtonText",
+    "SafetyReport",
+    "SafetyReportFrench",
+    "LiftNotification",
+    "OpenTerrainAcres",
+    "TotalTerrainAcres",
+    "StormTotalIn",
+    "StormTotalCM",
+    "AnnualAverageSnowfallIn",
+    "AnnualAverageSnowfallCm",
+    "SnowBaseRangeIn",
+    "SnowBaseRangeCM",
+    "SeasonTotalIn",
+    "SeasonTotalCm",
+    "SecondarySeasonTotalIn",
+    "SecondarySeasonTotalCm",
+    "OpenTerrainHectares",
+    "TotalTerrainHectares",
+    "TotalOpenTrails",
+    "TotalTrails",
+    "TotalTrailsMakingSnow",
+    "GroomedTrails",
+    "TotalOpenLifts",
+    "TotalLifts",
+    "TotalOpenActivities",
+    "TotalActivities",
+    "TotalOpenParks",
+    "TotalParks",
+    "OpenNightParks",
+    "TotalNightParks",
+    "TotalParkFeatures",
+    "OpenNightTrails",
+    "TotalNightTrails",
+    "GroomingActive",
+    "SnowMakingActive",
+    "TotalHalfpipes",
+    "OpenHalfpipes",
+)
+
+# Client counters tracking requests and bytes pulled over the network
+BANDWIDTH_STATS = (
+    "requests_today",
+    "bytes_received_today",
+    "bytes_decompressed_today",
+)
+
+# SnowReport keys holding free text or flags; everything else is numeric
+TEXT_SNOW_REPORT_KEYS = frozenset(
+    (
+        "BaseConditions",
+        "Report",
+        "AdditionalText",
+        "News",
+        "Alert",
+        "StormRadar",
+        "StormRadarButtonText",
+        "SafetyReport",
+        "SafetyReportFrench",
+        "LiftNotification",
+        "GroomingActive",
+        "SnowMakingActive",
+    )
+)
+
+RANKING_NAMES = {
+    "new_snow": "Top New Snow",
+    "open_terrain": "Most Terrain Open",
+    "coldest_summit": "Coldest Summit",
+}
+
+RANKING_UNITS = {
+    "new_snow": "in",
+    "open_terrain": "acre",
+    "coldest_summit": UnitOfTemperature.CELSIUS,
+}
+
 
 async def async_setup_platform(
     hass: HomeAssistant, config, async_add_entities, discovery_info=None
@@ -37,128 +146,61 @@ async def async_setup_entry(
         return
 
     coordinator = entry_data.get("coordinator")
-    mountains = entry.data.get("mountains")
 
-    if mountains:
+    @callback
+    def async_add_resorts(mountains: Iterable[str]) -> None:
+        """Add the sensors of the given resorts from the current snapshot."""
         for mountain in mountains:
-            sensors = [MtnPowderSensor(coordinator, mountain, ("operating_status",))]
-            # SnowReport keys that are simple values (not dict or list)
-            snow_keys = [
-                "BaseConditions",
-                "Report",
-                "AdditionalText",
-                "News",
-                "Alert",
-                "StormRadar",
-                "StormRadarButtonText",
-                "SafetyReport",
-                "SafetyReportFrench",
-                "LiftNotification",
-                "OpenTerrainAcres",
-                "TotalTerrainAcres",
-                "StormTotalIn",
-                "StormTotalCM",
-                "AnnualAverageSnowfallIn",
-                "AnnualAverageSnowfallCm",
-                "SnowBaseRangeIn",
-                "SnowBaseRangeCM",
-                "SeasonTotalIn",
-                "SeasonTotalCm",
-                "SecondarySeasonTotalIn",
-                "SecondarySeasonTotalCm",
-                "OpenTerrainHectares",
-                "TotalTerrainHectares",
-                "TotalOpenTrails",
-                "TotalTrails",
-                "TotalTrailsMakingSnow",
-                "GroomedTrails",
-                "TotalOpenLifts",
-                "TotalLifts",
-                "TotalOpenActivities",
-                "TotalActivities",
-                "TotalOpenParks",
-                "TotalParks",
-                "OpenNightParks",
-                "TotalNightParks",
-                "TotalParkFeatures",
-                "OpenNightTrails",
-                "TotalNightTrails",
-                "GroomingActive",
-                "SnowMakingActive",
-                "TotalHalfpipes",
-                "OpenHalfpipes",
-            ]
-            for key in snow_keys:
-                sensors.append(
-                    MtnPowderSensor(coordinator, mountain, ("snow_report", key))
-                )
+            view = ResortView(coordinator, mountain)
+            resort = view.resort
+            if resort is None:
+                _LOGGER.warning("Resort %s not found in feed", mountain)
+                continue
+            sensors = [MtnPowderSensor(view, ("operating_status",))]
+            for key in SNOW_REPORT_KEYS:
+                sensors.append(MtnPowderSensor(view, ("snow_report", key)))
 
-            # MountainAreas sensors
-            resort_data = [
-                item for item in coordinator.data["Resorts"] if item["Name"] == mountain
-            ][0]
-            mountain_areas = resort_data.get("MountainAreas", [])
-            for area in mountain_areas:
-                sensors.append(
-                    MtnPowderSensor(coordinator, mountain, ("area", area["Name"]))
-                )
+            # MountainAreas, trail, lift and activity sensors
+            for kind in ("area", *RECORD_KINDS):
+                for record_key in resort.keys(kind):
+                    sensors.append(MtnPowderSensor(view, record_key))
 
-            # Trails sensors
-            for area in mountain_areas:
-                for trail in area.get("Trails", []):
-                    sensors.append(
-                        MtnPowderSensor(
-                            coordinator,
-                            mountain,
-                            ("trail", area["Name"], trail["Name"]),
-                        )
-                    )
-
-            # Lifts sensors
-            for area in mountain_areas:
-                for lift in area.get("Lifts", []):
-                    sensors.append(
-                        MtnPowderSensor(
-                            coordinator,
-                            mountain,
-                            ("lift", area["Name"], lift["Name"]),
-                        )
-                    )
-
-            # Activities sensors
-            for area in mountain_areas:
-                for activity in area.get("Activities", []):
-                    sensors.append(
-                        MtnPowderSensor(
-                            coordinator,
-                            mountain,
-                            ("activity", area["Name"], activity["Name"]),
-                        )
-                    )
-
-            async_add_entities(sensors, True)
+            # Rendered from the loaded snapshot when added, without a refresh
+            async_add_entities(sensors)
 
             # Add update tracking sensors
             async_add_entities(
                 [
-                    MtnPowderSensor(coordinator, mountain, ("stats", "updates_today")),
-                    MtnPowderSensor(
-                        coordinator, mountain, ("stats", "no_updates_today")
+                    *(
+                        MtnPowderSensor(view, ("stats", stat_type))
+                        for stat_type in CLIENT_STATS
                     ),
-                ],
-                True,
+                    MtnPowderSensor(view, ("data_age",)),
+                ]
             )
 
+    # Kept so resorts added in the options flow get entities without a reload
+    entry_data["add_resorts"]["sensor"] = async_add_resorts
 
-class MtnPowderSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
+    mountains = get_mountains(entry)
+    async_add_resorts(mountains)
+
+    if has_rankings(mountains):
+        async_add_entities(
+            [
+                MtnPowderRankingSensor(coordinator, entry, ranking)
+                for ranking in RANKINGS
+            ]
+        )
+
+
+class MtnPowderSensor(MtnPowderResortEntity, SensorEntity, RestoreEntity):
     """Sensor representing MtnPowder data."""
 
-    def __init__(
-        self, coordinator: DataUpdateCoordinator, mountain: str, sensor_type: tuple
-    ) -> None:
+    def __init__(self, view: ResortView, sensor_type: tuple) -> None:
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._mountain = mountain
+        super().__init__(view)
+        mountain = view.name
         self._sensor_type = sensor_type
         if sensor_type[0] == "operating_status":
             self._attr_name = f"{mountain} Operating Status"
@@ -171,14 +213,21 @@ class MtnPowderSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
             self._attr_unique_id = f"{mountain}_snow_report_{key}"
             # Add unit_of_measurement for known units
             if key.endswith("In"):
-                self._attr_unit_of_measurement = "in"
-            elif key.endswith("CM"):
-                self._attr_unit_of_measurement = "cm"
+                self._attr_native_unit_of_measurement = "in"
+            elif key.endswith(("CM", "Cm")):
+                self._attr_native_unit_of_measurement = "cm"
             elif "Acres" in key:
-                self._attr_unit_of_measurement = "acre"
+                self._attr_native_unit_of_measurement = "acre"
             elif "Hectares" in key:
-                self._attr_unit_of_measurement = "ha"
+                self._attr_native_unit_of_measurement = "ha"
             # For counts, no unit needed
+            if key not in TEXT_SNOW_REPORT_KEYS:
+                # Season totals only grow until they reset for the next season
+                self._attr_state_class = (
+                    SensorStateClass.TOTAL_INCREASING
+                    if "SeasonTotal" in key
+                    else SensorStateClass.MEASUREMENT
+                )
         elif sensor_type[0] == "area":
             area_name = sensor_type[1]
             self._attr_name = f"{mountain} {area_name} Open Trails"
@@ -205,6 +254,29 @@ class MtnPowderSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
             display_name = stat_type.replace("_", " ").title()
             self._attr_name = f"{mountain} {display_name}"
             self._attr_unique_id = f"{mountain}_{stat_type}"
+            if stat_type in BANDWIDTH_STATS:
+                self._attr_entity_category = EntityCategory.DIAGNOSTIC
+                self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+            if stat_type.startswith("bytes_"):
+                self._attr_device_class = SensorDeviceClass.DATA_SIZE
+                self._attr_native_unit_of_measurement = UnitOfInformation.BYTES
+        elif sensor_type[0] == "data_age":
+            self._attr_name = f"{mountain} Data Age"
+            self._attr_unique_id = f"{mountain}_data_age"
+            self._attr_entity_category = EntityCategory.DIAGNOSTIC
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.MINUTES
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        # Record rendered by this sensor, None for client statistics
+        if sensor_type[0] == "operating_status":
+            self._record_key = ("resort",)
+        elif sensor_type[0] == "snow_report":
+            self._record_key = ("snow_report",)
+        elif sensor_type[0] in ("area", *RECORD_KINDS):
+            self._record_key = sensor_type
+        else:
+            self._record_key = None
+        self._fingerprint = None
         self._state = None
         self._attr_extra_state_attributes = {}
 
@@ -213,11 +285,6 @@ class MtnPowderSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
         """Return the native value of the sensor."""
         return self._state
 
-    @property
-    def available(self):
-        """Return if the sensor is available."""
-        return self.coordinator.data is not None
-
     async def async_added_to_hass(self):
         """Handle entity being added to hass."""
         await super().async_added_to_hass()
@@ -226,131 +293,102 @@ class MtnPowderSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
         self._handle_coordinator_update()
 
     def _handle_coordinator_update(self) -> None:
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if not resort:
+        kind = self._sensor_type[0]
+        resort = self.view.resort
+        if resort is not None and self._record_key is not None:
+            fingerprint = resort.fingerprint(self._record_key)
+            # Skip rebuilding state and attributes of an unchanged record
+            if fingerprint is not None and fingerprint == self._fingerprint:
+                return
+            self._fingerprint = fingerprint
+        else:
+            self._fingerprint = None
+        if kind == "stats":
+            self._state = self.coordinator.stats.get(self._sensor_type[1], 0)
+            self._attr_extra_state_attributes = {}
+        elif not resort:
             self._state = None
+        elif kind == "data_age":
+            self._update_data_age(resort)
+        elif kind == "operating_status":
+            self._state = resort.get(("resort",)).get("OperatingStatus")
+        elif kind == "snow_report":
+            key = self._sensor_type[1]
+            value = resort.get(("snow_report",)).get(key)
+            if key in TEXT_SNOW_REPORT_KEYS:
+                self._state = truncate_state(value)
+            else:
+                self._state = parse_number(value)
         else:
-            if self._sensor_type[0] == "operating_status":
-                self._state = resort.get("OperatingStatus")
-            elif self._sensor_type[0] == "snow_report":
-                key = self._sensor_type[1]
-                snow_report = resort["SnowReport"]
-                value = snow_report[key]
-                if isinstance(value, str) and len(value) > 255:
-                    self._state = value[:252] + "..."
-                else:
-                    self._state = value
-            elif self._sensor_type[0] == "area":
-                area_name = self._sensor_type[1]
-                mountain_areas = resort.get("MountainAreas", [])
-                area = next((a for a in mountain_areas if a["Name"] == area_name), None)
-                if area:
-                    self._state = area.get("OpenTrailsCount", 0)
-                    self._attr_extra_state_attributes = {
-                        "total_trails_count": area.get("TotalTrailsCount"),
-                        "last_update": area.get("LastUpdate"),
-                    }
-                else:
-                    self._state = None
-                    self._attr_extra_state_attributes = {}
-            elif self._sensor_type[0] == "trail":
-                area_name = self._sensor_type[1]
-                trail_name = self._sensor_type[2]
-                mountain_areas = resort.get("MountainAreas", [])
-                area = next((a for a in mountain_areas if a["Name"] == area_name), None)
-                if area:
-                    trails = area.get("Trails", [])
-                    trail = next((t for t in trails if t["Name"] == trail_name), None)
-                    if trail:
-                        value = trail.get("StatusEnglish", "unknown")
-                        if isinstance(value, str) and len(value) > 255:
-                            self._state = value[:252] + "..."
-                        else:
-                            self._state = value
-                        self._attr_extra_state_attributes = {
-                            "difficulty": trail.get("Difficulty"),
-                            "snow_making": trail.get("SnowMaking"),
-                            "grooming": trail.get("Grooming"),
-                            "night_skiing": trail.get("NightSkiing"),
-                            "moguls": trail.get("Moguls"),
-                            "glades": trail.get("Glades"),
-                            "touring": trail.get("Touring"),
-                            "nordic": trail.get("Nordic"),
-                            "terrain_park_on_run": trail.get("TerrainParkOnRun"),
-                            "run_of_the_day": trail.get("RunOfTheDay"),
-                            "trail_summary": trail.get("TrailSummary"),
-                            "terrain_park_features": trail.get("TerrainParkFeatures"),
-                            "update_date": trail.get("UpdateDate"),
-                        }
-                    else:
-                        self._state = None
-                        self._attr_extra_state_attributes = {}
-                else:
-                    self._state = None
-                    self._attr_extra_state_attributes = {}
-            elif self._sensor_type[0] == "lift":
-                area_name = self._sensor_type[1]
-                lift_name = self._sensor_type[2]
-                mountain_areas = resort.get("MountainAreas", [])
-                area = next((a for a in mountain_areas if a["Name"] == area_name), None)
-                if area:
-                    lifts = area.get("Lifts", [])
-                    lift = next((l for l in lifts if l["Name"] == lift_name), None)
-                    if lift:
-                        value = lift.get("StatusEnglish", "unknown")
-                        if isinstance(value, str) and len(value) > 255:
-                            self._state = value[:252] + "..."
-                        else:
-                            self._state = value
-                        self._attr_extra_state_attributes = {
-                            k: v
-                            for k, v in lift.items()
-                            if k not in ("Status", "StatusEnglish", "Id")
-                        }
-                    else:
-                        self._state = None
-                        self._attr_extra_state_attributes = {}
-                else:
-                    self._state = None
-                    self._attr_extra_state_attributes = {}
-            elif self._sensor_type[0] == "activity":
-                area_name = self._sensor_type[1]
-                activity_name = self._sensor_type[2]
-                mountain_areas = resort.get("MountainAreas", [])
-                area = next((a for a in mountain_areas if a["Name"] == area_name), None)
-                if area:
-                    activities = area.get("Activities", [])
-                    activity = next(
-                        (act for act in activities if act["Name"] == activity_name),
-                        None,
-                    )
-                    if activity:
-                        value = activity.get("StatusEnglish", "unknown")
-                        if isinstance(value, str) and len(value) > 255:
-                            self._state = value[:252] + "..."
-                        else:
-                            self._state = value
-                        self._attr_extra_state_attributes = {
-                            k: v
-                            for k, v in activity.items()
-                            if k not in ("Status", "StatusEnglish", "Id")
-                        }
-                    else:
-                        self._state = None
-                        self._attr_extra_state_attributes = {}
-                else:
-                    self._state = None
-                    self._attr_extra_state_attributes = {}
-            elif self._sensor_type[0] == "stats":
-                stat_type = self._sensor_type[1]
-                stats = resort.get("stats", {})
-                self._state = stats.get(stat_type, 0)
-                self._attr_extra_state_attributes = {}
+            record = resort.get(self._sensor_type)
+            if record is not None:
+                self._state = record_state(kind, record)
+                self._attr_extra_state_attributes = record_attributes(kind, record)
             else:
                 self._state = None
                 self._attr_extra_state_attributes = {}
         self.async_write_ha_state()
+
+    def _update_data_age(self, resort: ResortRecord) -> None:
+        """Compute how old the served data is from the feed and fetch times."""
+        now = dt_util.utcnow()
+        last_update = parse_timestamp(resort.get(("resort",)).get("LastUpdate"))
+        snow_report_update = parse_timestamp(
+            resort.get(("snow_report",)).get("LastUpdate")
+        )
+        last_fetch = self.coordinator.last_fetch_success
+        self._state = (
+            round((now - last_update).total_seconds() / 60) if last_update else None
+        )
+        self._attr_extra_state_attributes = {
+            "last_update": last_update.isoformat() if last_update else None,
+            "snow_report_last_update": (
+                snow_report_update.isoformat() if snow_report_update else None
+            ),
+            "last_successful_fetch": last_fetch.isoformat() if last_fetch else None,
+            "fetch_age_minutes": (
+                round((now - last_fetch).total_seconds() / 60) if last_fetch else None
+            ),
+        }
+
+
+class MtnPowderRankingSensor(CoordinatorEntity, SensorEntity):
+    """Sensor naming the leading resort of a cross-resort ranking.
+
+    The top resorts with their values are kept in a single ``ranking``
+    attribute, replacing templates over every resort's sensors.
+    """
+
+    def __init__(
+        self, coordinator: DataUpdateCoordinator, entry: ConfigEntry, ranking: str
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._ranking = ranking
+        self._entries: list[dict] | None = None
+        self._attr_name = f"{DEFAULT_NAME} {RANKING_NAMES[ranking]}"
+        self._attr_unique_id = f"{entry.entry_id}_ranking_{ranking}"
+        self._attr_device_info = entry_device_info(entry)
+
+    @property
+    def available(self):
+        """Return if the sensor is available."""
+        return self.coordinator.data is not None
+
+    async def async_added_to_hass(self):
+        """Handle entity being added to hass."""
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
+
+    def _handle_coordinator_update(self) -> None:
+        entries = self.coordinator.rankings.get(self._ranking, [])
+        # Rankings are only recomputed when the feed changed
+        if entries is self._entries:
+            return
+        self._entries = entries
+        self._attr_native_value = entries[0]["resort"] if entries else None
+        self._attr_extra_state_attributes = {
+            "unit": RANKING_UNITS[self._ranking],
+            "ranking": entries,
+        }
+        self.async_write_ha_state()
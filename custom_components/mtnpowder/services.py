@@ -0,0 +1,97 @@
+"""Services for the MtnPowder integration."""
+
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN
+from .export import EXPORT_FORMATS, async_get_coordinator, build_export, iter_ndjson
+from .feed import resort_tree
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_EXPORT_SNAPSHOT = "export_snapshot"
+SERVICE_PROFILE = "profile"
+
+EXPORT_SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Optional("resorts"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("format", default="json"): vol.In(EXPORT_FORMATS),
+        vol.Optional("etag"): cv.string,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Optional("cycles", default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=20)
+        ),
+        vol.Optional("refresh", default=True): cv.boolean,
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    @callback
+    def async_export_snapshot(call: ServiceCall) -> ServiceResponse:
+        """Return the normalized snapshot of the selected resorts."""
+        coordinator = async_get_coordinator(hass, call.data.get("config_entry_id"))
+        if coordinator is None or coordinator.data is None:
+            raise ServiceValidationError("No MtnPowder data is loaded")
+        fmt = call.data["format"]
+        export = build_export(coordinator, call.data.get("resorts"), fmt)
+        if call.data.get("etag") == export.etag:
+            return {"etag": export.etag, "not_modified": True}
+        if fmt == "ndjson":
+            return {
+                "etag": export.etag,
+                "ndjson": b"".join(iter_ndjson(export)).decode(),
+            }
+        return {
+            "etag": export.etag,
+            "version": export.version,
+            "resorts": [resort_tree(resort) for resort in export.resorts],
+        }
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the next refresh cycles and write the stats to the config dir."""
+        coordinator = async_get_coordinator(hass, call.data.get("config_entry_id"))
+        if coordinator is None:
+            raise ServiceValidationError("No MtnPowder entry is loaded")
+        try:
+            path = coordinator.async_start_profile(call.data["cycles"])
+        except ValueError as err:
+            raise ServiceValidationError(str(err)) from err
+        _LOGGER.info(
+            "Profiling the next %d refresh cycles into %s", call.data["cycles"], path
+        )
+        if call.data["refresh"]:
+            await coordinator.async_request_refresh()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_SNAPSHOT,
+        async_export_snapshot,
+        schema=EXPORT_SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
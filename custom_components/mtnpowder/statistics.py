@@ -0,0 +1,137 @@
+"""Long-term snow history statistics for MtnPowder."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN
+from .feed import FeedSnapshot, parse_number
+
+_LOGGER = logging.getLogger(__name__)
+
+# SnowReport key -> (statistic name suffix, unit)
+STATISTIC_SERIES = {
+    "SeasonTotalIn": ("Season Total", "in"),
+    "StormTotalIn": ("Storm Total", "in"),
+    "SnowBaseRangeIn": ("Snow Base", "in"),
+    "OpenTerrainAcres": ("Open Terrain", "acre"),
+    "TotalOpenTrails": ("Open Trails", None),
+    "TotalOpenLifts": ("Open Lifts", None),
+}
+
+
+def statistic_id(mountain: str, key: str) -> str:
+    """Return the external statistic id for a resort series."""
+    return f"{DOMAIN}:{slugify(f'{mountain}_{key}')}"
+
+
+class _HourBucket:
+    """Running min/max/mean of the samples taken during one hour."""
+
+    __slots__ = ("min", "max", "total", "count")
+
+    def __init__(self, value: float) -> None:
+        self.min = self.max = self.total = value
+        self.count = 1
+
+    def add(self, value: float) -> None:
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.total += value
+        self.count += 1
+
+
+class SnowHistory:
+    """Aggregate snow report samples into hourly external statistics.
+
+    Samples are kept in memory until their hour has passed and are then
+    written with a single insert per series, so the recorder only sees one
+    row per series and hour instead of every coordinator refresh.
+    """
+
+    def __init__(self, hass: HomeAssistant, mountains: list[str]) -> None:
+        """Initialize the history for the selected resorts."""
+        self.hass = hass
+        self.mountains = mountains
+        self._buckets: dict[tuple[str, str], dict[datetime, _HourBucket]] = {}
+
+    @callback
+    def async_add_snapshot(
+        self, snapshot: FeedSnapshot | None, now: datetime | None = None
+    ) -> None:
+        """Sample the tracked series and flush every completed hour."""
+        if snapshot is None:
+            return
+        now = now or dt_util.utcnow()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        for mountain in self.mountains:
+            resort = snapshot.resorts.get(mountain)
+            if resort is None:
+                continue
+            snow_report = resort.get(("snow_report",))
+            for key in STATISTIC_SERIES:
+                value = parse_number(snow_report.get(key))
+                if value is None:
+                    continue
+                hours = self._buckets.setdefault((mountain, key), {})
+                if (bucket := hours.get(hour)) is None:
+                    hours[hour] = _HourBucket(value)
+                else:
+                    bucket.add(value)
+        self.async_flush(before=hour)
+
+    @callback
+    def async_flush_completed(self) -> None:
+        """Write the hours that have passed, keeping the current one buffered."""
+        self.async_flush(
+            before=dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+        )
+
+    @callback
+    def async_flush(self, before: datetime | None = None) -> None:
+        """Write buffered hours, by default including the current one."""
+        for (mountain, key), hours in self._buckets.items():
+            starts = sorted(
+                start for start in hours if before is None or start < before
+            )
+            if not starts:
+                continue
+            name, unit = STATISTIC_SERIES[key]
+            metadata = StatisticMetaData(
+                mean_type=StatisticMeanType.ARITHMETIC,
+                has_sum=False,
+                name=f"{mountain} {name}",
+                source=DOMAIN,
+                statistic_id=statistic_id(mountain, key),
+                unit_class=None,
+                unit_of_measurement=unit,
+            )
+            statistics = []
+            for start in starts:
+                bucket = hours.pop(start)
+                statistics.append(
+                    StatisticData(
+                        start=start,
+                        mean=bucket.total / bucket.count,
+                        min=bucket.min,
+                        max=bucket.max,
+                    )
+                )
+            _LOGGER.debug(
+                "Adding %d hourly statistics for %s",
+                len(statistics),
+                metadata["statistic_id"],
+            )
+            async_add_external_statistics(self.hass, metadata, statistics)
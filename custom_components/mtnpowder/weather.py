@@ -2,63 +2,29 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable
 import logging
-from datetime import datetime, timedelta, time
 
 from homeassistant.components.weather import WeatherEntity, WeatherEntityFeature
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfPressure, UnitOfSpeed, UnitOfTemperature
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-)
+from homeassistant.core import HomeAssistant, callback
 
+from . import get_mountains
 from .const import DOMAIN
+from .entity import MtnPowderResortEntity, ResortView
+from .feed import (
+    build_forecast,
+    conditions_attributes,
+    direction_to_bearing as _direction_to_bearing,
+    map_condition as _map_condition,
+    parse_float,
+    parse_int,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def _direction_to_bearing(direction: str) -> int | None:
-    """Convert wind direction string to bearing in degrees."""
-    directions = {
-        "N": 0,
-        "NNE": 22,
-        "NE": 45,
-        "ENE": 67,
-        "E": 90,
-        "ESE": 112,
-        "SE": 135,
-        "SSE": 157,
-        "S": 180,
-        "SSW": 202,
-        "SW": 225,
-        "WSW": 247,
-        "W": 270,
-        "WNW": 292,
-        "NW": 315,
-        "NNW": 337,
-    }
-    return directions.get(direction.upper())
-
-
-def _map_condition(condition: str) -> str | None:
-    """Map API condition to HA condition."""
-    mapping = {
-        "clear": "sunny",
-        "cloudy": "cloudy",
-        "fog": "fog",
-        "hail": "hail",
-        "lightning": "lightning",
-        "rainy": "rainy",
-        "snowy": "snowy",
-        "windy": "windy",
-        "partly cloudy": "partly-cloudy",
-        # Add more if needed
-    }
-    return mapping.get(condition.lower(), "sunny")
-
-
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities
 ):
@@ -70,60 +36,49 @@ async def async_setup_entry(
         return
 
     coordinator = entry_data.get("coordinator")
-    mountains = entry.data.get("mountains")
 
-    if mountains:
+    @callback
+    def async_add_resorts(mountains: Iterable[str]) -> None:
+        """Add the weather entities of the given resorts."""
         weather_entities = []
         for mountain in mountains:
+            view = ResortView(coordinator, mountain)
             # Areas: Base, MidMountain, Summit
-            resort = [
-                item
-                for item in self.coordinator.data["Resorts"]
-                if item["Name"] == mountain
-            ][0]
-            areas = resort.get("CurrentConditions", [])
-            for area in areas:
-                weather_entities.append(MtnPowderWeather(coordinator, mountain, area))
-        async_add_entities(weather_entities, True)
+            resort = view.resort
+            if resort is None:
+                continue
+            for _, area in resort.keys("conditions"):
+                weather_entities.append(MtnPowderWeather(view, area))
+        async_add_entities(weather_entities)
 
+    entry_data["add_resorts"]["weather"] = async_add_resorts
+    async_add_resorts(get_mountains(entry))
 
-class MtnPowderWeather(CoordinatorEntity, WeatherEntity):
+
+class MtnPowderWeather(MtnPowderResortEntity, WeatherEntity):
     """Weather entity for MtnPowder areas."""
 
-    def __init__(
-        self, coordinator: DataUpdateCoordinator, mountain: str, area: str
-    ) -> None:
+    def __init__(self, view: ResortView, area: str) -> None:
         """Initialize the weather entity."""
-        super().__init__(coordinator)
-        self._mountain = mountain
+        super().__init__(view)
         self._area = area
-        self._attr_name = f"{mountain} {area} Weather"
-        self.unique_id = f"{mountain}_{area}_weather"
+        self._attr_name = f"{view.name} {area} Weather"
+        self._attr_unique_id = f"{view.name}_{area}_weather"
         self._attr_extra_state_attributes = {}
+        self._fingerprint: tuple | None = None
 
-    @property
-    def available(self):
-        """Return if the entity is available."""
-        return self.coordinator.data is not None
+    def _conditions(self) -> dict | None:
+        """Return the current conditions record for this area."""
+        resort = self.view.resort
+        if resort is None:
+            return None
+        return resort.get(("conditions", self._area))
 
     @property
     def native_temperature(self):
         """Return the temperature."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                temp_c = area_data.get("TemperatureC")
-                if temp_c and temp_c != "--":
-                    try:
-                        return float(temp_c)
-                    except ValueError:
-                        pass
+        if area_data := self._conditions():
+            return parse_float(area_data.get("TemperatureC"))
         return None
 
     @property
@@ -134,41 +89,15 @@ class MtnPowderWeather(CoordinatorEntity, WeatherEntity):
     @property
     def humidity(self):
         """Return the humidity."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                humidity = area_data.get("Humidity")
-                if humidity and humidity != "--":
-                    try:
-                        return int(humidity)
-                    except ValueError:
-                        pass
+        if area_data := self._conditions():
+            return parse_int(area_data.get("Humidity"))
         return None
 
     @property
     def native_wind_speed(self):
         """Return the wind speed."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                wind_kph = area_data.get("WindStrengthKph")
-                if wind_kph and wind_kph != "--":
-                    try:
-                        return float(wind_kph)
-                    except ValueError:
-                        pass
+        if area_data := self._conditions():
+            return parse_float(area_data.get("WindStrengthKph"))
         return None
 
     @property
@@ -179,38 +108,17 @@ class MtnPowderWeather(CoordinatorEntity, WeatherEntity):
     @property
     def wind_bearing(self):
         """Return the wind bearing."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                direction = area_data.get("WindDirection")
-                if direction:
-                    return _direction_to_bearing(direction)
+        if area_data := self._conditions():
+            direction = area_data.get("WindDirection")
+            if direction:
+                return _direction_to_bearing(direction)
         return None
 
     @property
     def native_pressure(self):
         """Return the pressure."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                pressure_mb = area_data.get("PressureMB")
-                if pressure_mb and pressure_mb != "--":
-                    try:
-                        return float(pressure_mb)
-                    except ValueError:
-                        pass
+        if area_data := self._conditions():
+            return parse_float(area_data.get("PressureMB"))
         return None
 
     @property
@@ -221,100 +129,19 @@ class MtnPowderWeather(CoordinatorEntity, WeatherEntity):
     @property
     def condition(self):
         """Return the weather condition."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                api_condition = area_data.get("Skies")
-                if api_condition:
-                    return _map_condition(api_condition)
+        if area_data := self._conditions():
+            api_condition = area_data.get("Skies")
+            if api_condition:
+                return _map_condition(api_condition)
         return None
 
     @property
     def forecast(self):
         """Return the forecast."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if not resort:
-            return None
-        forecast_data = resort.get("Forecast", {})
-        current_conditions = resort.get("CurrentConditions", {})
-        area_data = current_conditions.get(self._area)
-        if not forecast_data:
+        resort = self.view.resort
+        if resort is None:
             return None
-        # Get area's temp high/low in F
-        temp_high_f_area = area_data.get("TemperatureHighF")
-        temp_low_f_area = area_data.get("TemperatureLowF")
-        forecasts = []
-        day_keys = ["OneDay", "TwoDay", "ThreeDay", "FourDay", "FiveDay"]
-        for day_key in day_keys:
-            day_data = forecast_data.get(day_key)
-            if not day_data:
-                continue
-            date_str = day_data.get("date")
-            if not date_str:
-                continue
-            try:
-                date = datetime.fromisoformat(date_str)
-            except ValueError:
-                continue
-            condition = _map_condition(day_data.get("conditions", ""))
-            temp_high = day_data.get("temp_high_f")
-            temp_low = day_data.get("temp_low_f")
-            if temp_high == "--" or temp_low == "--":
-                continue
-            try:
-                if day_key == "OneDay" and temp_high_f_area is not None:
-                    temp_high_f = temp_high_f_area
-                    temp_low_f = temp_low_f_area
-                else:
-                    temp_high_f = float(temp_high)
-                    temp_low_f = float(temp_low)
-            except ValueError:
-                continue
-            # Daytime forecast
-            snow_day = day_data.get("forecasted_snow_day_in", "0")
-            if "-" in snow_day:
-                snow_day = snow_day.split("-")[0]
-            try:
-                precip_day = float(snow_day) * 25.4 if snow_day != "0" else 0.0
-            except ValueError:
-                precip_day = 0.0
-            daytime_forecast = {
-                "datetime": date.replace(hour=12, minute=0, second=0, microsecond=0),
-                "condition": condition,
-                "temperature": temp_high_f,
-                "templow": temp_low_f,
-                "precipitation": precip_day,
-            }
-            forecasts.append(daytime_forecast)
-            # Nighttime forecast
-            snow_night = day_data.get("forecasted_snow_night_in", "0")
-            if "-" in snow_night:
-                snow_night = snow_night.split("-")[0]
-            try:
-                precip_night = float(snow_night) * 25.4 if snow_night != "0" else 0.0
-            except ValueError:
-                precip_night = 0.0
-            nighttime_forecast = {
-                "datetime": (date + timedelta(days=1)).replace(
-                    hour=0, minute=0, second=0, microsecond=0
-                ),
-                "condition": condition,
-                "temperature": temp_low_f,
-                "templow": temp_low_f,
-                "precipitation": precip_night,
-            }
-            forecasts.append(nighttime_forecast)
-        return forecasts
+        return build_forecast(resort.get(("forecast",)), self._conditions())
 
     async def async_added_to_hass(self):
         """Handle entity being added to hass."""
@@ -325,43 +152,21 @@ class MtnPowderWeather(CoordinatorEntity, WeatherEntity):
 
     def _handle_coordinator_update(self) -> None:
         """Handle coordinator update."""
-        resort = [
-            item
-            for item in self.coordinator.data["Resorts"]
-            if item["Name"] == self._mountain
-        ][0]
-        if resort:
-            current_conditions = resort.get("CurrentConditions", {})
-            area_data = current_conditions.get(self._area)
-            if area_data:
-                self._attr_extra_state_attributes = {
-                    k: v
-                    for k, v in area_data.items()
-                    if k
-                    not in (
-                        "Name",
-                        "Icon",
-                        "IconFADefault",
-                        "TemperatureF",
-                        "TemperatureC",
-                        "TemperatureLowF",
-                        "TemperatureHighF",
-                        "TemperatureLowC",
-                        "TemperatureHighC",
-                        "PressureIN",
-                        "PressureMB",
-                        "WindDirection",
-                        "WindStrengthMph",
-                        "WindStrengthKph",
-                        "HumidityC",
-                        "HumidityF",
-                        "DewPointC",
-                        "DewPointF",
-                        "Conditions",
-                    )
-                }
-            else:
-                self._attr_extra_state_attributes = {}
+        resort = self.view.resort
+        fingerprint = (
+            (
+                resort.fingerprint(("conditions", self._area)),
+                resort.fingerprint(("forecast",)),
+            )
+            if resort is not None
+            else None
+        )
+        # Conditions and forecast are all this entity renders
+        if fingerprint is not None and fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+        if area_data := self._conditions():
+            self._attr_extra_state_attributes = conditions_attributes(area_data)
         else:
             self._attr_extra_state_attributes = {}
         self.async_write_ha_state()
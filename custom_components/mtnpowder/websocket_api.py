@@ -0,0 +1,89 @@
+"""Websocket API for the MtnPowder integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .export import async_get_coordinator
+from .feed import resort_delta, resort_tree
+
+ERR_ENTRY_UNLOADED = "entry_unloaded"
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "mtnpowder/subscribe",
+        vol.Required("resort"): str,
+        vol.Optional("entry_id"): str,
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Send the normalized tree of a resort, then only the records that change.
+
+    The first event carries ``tree``; every later event carries ``changed``
+    (added or updated records keyed by record id) and ``removed`` record ids.
+    When the entry unloads the subscription ends with an ``entry_unloaded``
+    error so the client can subscribe again.
+    """
+    coordinator = async_get_coordinator(hass, msg.get("entry_id"))
+    name = msg["resort"]
+    if (
+        coordinator is None
+        or coordinator.data is None
+        or name not in coordinator.data.resorts
+    ):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, f"Resort {name} not found"
+        )
+        return
+
+    @callback
+    def async_forward_changes() -> None:
+        """Send the records that changed in the latest snapshot."""
+        if not (diff := coordinator.changes.get(name)):
+            return
+        resort = coordinator.data.resorts.get(name)
+        connection.send_message(
+            websocket_api.event_message(msg["id"], resort_delta(resort, diff))
+        )
+
+    remove_listener = coordinator.async_add_listener(async_forward_changes)
+
+    @callback
+    def async_unsubscribe() -> None:
+        """Stop forwarding changes and forget the subscription."""
+        remove_listener()
+        coordinator.subscriptions.discard(async_close)
+
+    @callback
+    def async_close() -> None:
+        """Close the subscription; the reloaded entry has a new coordinator."""
+        connection.subscriptions.pop(msg["id"])()
+        connection.send_error(
+            msg["id"], ERR_ENTRY_UNLOADED, "Config entry unloaded, resubscribe"
+        )
+
+    connection.subscriptions[msg["id"]] = async_unsubscribe
+    coordinator.subscriptions.add(async_close)
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(
+            msg["id"], {"tree": resort_tree(coordinator.data.resorts[name])}
+        )
+    )
@@ -16,4 +16,83 @@ def sample_feed():
 @pytest.fixture
 def mock_api_response(sample_feed):
     """Mock API response."""
-    return Mock(json=Mock(return_value=sample_feed))
\ No newline at end of file
+    return Mock(json=Mock(return_value=sample_feed))
+
+
+def build_synthetic_feed(resorts=40, areas=4, trails=50, lifts=10, activities=5):
+    """Build a feed shaped like the MtnPowder feed with many records."""
+    statuses = ("Open", "Closed", "Expected", "Hold")
+    difficulties = ("Beginner", "Intermediate", "Advanced", "Expert")
+    feed = {"LastUpdate": "2025-11-24T15:42:20-0700", "Resorts": []}
+    for r in range(resorts):
+        mountain_areas = []
+        for a in range(areas):
+            mountain_areas.append(
+                {
+                    "Name": f"Area {a}",
+                    "OpenTrailsCount": trails // 2,
+                    "TotalTrailsCount": trails,
+                    "LastUpdate": "2025-11-24T15:22:44-0500",
+                    "Trails": [
+                        {
+                            "Name": f"Trail {a}-{t}",
+                            "StatusEnglish": statuses[t % len(statuses)],
+                            "Difficulty": difficulties[t % len(difficulties)],
+                            "SnowMaking": "false",
+                            "Grooming": "--",
+                            "UpdateDate": "2025-11-24T15:22:44-0500",
+                        }
+                        for t in range(trails)
+                    ],
+                    "Lifts": [
+                        {
+                            "Name": f"Lift {a}-{lift}",
+                            "Status": "0",
+                            "StatusEnglish": statuses[lift % len(statuses)],
+                            "LiftType": "Quad",
+                            "Capacity": "2400",
+                        }
+                        for lift in range(lifts)
+                    ],
+                    "Activities": [
+                        {
+                            "Name": f"Activity {a}-{act}",
+                            "StatusEnglish": statuses[act % len(statuses)],
+                            "Type": "Tubing",
+                        }
+                        for act in range(activities)
+                    ],
+                }
+            )
+        feed["Resorts"].append(
+            {
+                "Name": f"Resort {r}",
+                "LastUpdate": "2025-11-24T17:42:17-0500",
+                "OperatingStatus": statuses[r % len(statuses)],
+                "SnowReport": {
+                    "LastUpdate": "2025-11-24T15:22:44-0500",
+                    "BaseConditions": "--",
+                    "OpenTerrainAcres": str(r * 10),
+                    "TotalTerrainAcres": "670",
+                    "SeasonTotalIn": str(r),
+                    "StormTotalIn": str(r % 7),
+                    "SnowBaseRangeIn": f"{r}-{r + 6}",
+                    "TotalOpenLifts": str(r % 12),
+                    "GroomingActive": "false",
+                    "SnowMakingActive": "false",
+                },
+                "MountainAreas": mountain_areas,
+                "CurrentConditions": {
+                    "Base": {"TemperatureC": str(-r % 10), "Skies": "Clear"},
+                    "Summit": {"TemperatureC": str(-r), "Skies": "Snowy"},
+                },
+                "Forecast": {},
+            }
+        )
+    return feed
+
+
+@pytest.fixture
+def synthetic_feed():
+    """Return a factory for large synthetic feeds."""
+    return build_synthetic_feed
@@ -0,0 +1,319 @@
+"""Record and replay MtnPowder feed traces for soak testing.
+
+A trace is a gzip compressed JSON lines file with one feed response per line
+(body plus ETag/Last-Modified). Traces are either recorded from the live feed
+or synthesized by mutating a sample feed, and are replayed through the
+coordinator by swapping its client for a ReplayClient.
+
+    python -m tests.soak record trace.jsonl.gz --count 288
+    python -m tests.soak synthesize tests/sample_feed.json \\
+        trace.jsonl.gz --cycles 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+import copy
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+import gzip
+import json
+import logging
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from typing import Any
+
+import aiohttp
+
+from custom_components.mtnpowder.const import DEFAULT_SCAN_INTERVAL, FEED_URL
+from custom_components.mtnpowder.feed import (
+    CLIENT_STATS,
+    FeedError,
+    FetchResult,
+    ValuePool,
+    body_digest,
+    decode_feed,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_STATUSES = ("Open", "Closed", "Expected", "Hold")
+
+
+@dataclass(slots=True)
+class TraceEntry:
+    """One recorded feed response."""
+
+    offset: float
+    body: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def write_trace(path: str, entries: Iterable[TraceEntry]) -> int:
+    """Write entries to a compressed trace file and return how many were written."""
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as trace:
+        for entry in entries:
+            trace.write(json.dumps(asdict(entry), separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def read_trace(path: str) -> Iterator[TraceEntry]:
+    """Read the entries of a compressed trace file."""
+    with gzip.open(path, "rt", encoding="utf-8") as trace:
+        for line in trace:
+            if line.strip():
+                yield TraceEntry(**json.loads(line))
+
+
+async def async_record_trace(
+    session: aiohttp.ClientSession,
+    path: str,
+    count: int,
+    interval: float = DEFAULT_SCAN_INTERVAL,
+    url: str = FEED_URL,
+) -> int:
+    """Poll the feed and append every changed response to a trace file."""
+    start = time.monotonic()
+    last_digest = None
+    recorded = 0
+    with gzip.open(path, "at", encoding="utf-8") as trace:
+        for poll in range(count):
+            if poll:
+                await asyncio.sleep(interval)
+            try:
+                async with session.get(url) as resp:
+                    body = await resp.text()
+                    entry = TraceEntry(
+                        time.monotonic() - start,
+                        body,
+                        resp.headers.get("ETag"),
+                        resp.headers.get("Last-Modified"),
+                    )
+            except (aiohttp.ClientError, TimeoutError) as err:
+                _LOGGER.warning("Error recording feed: %s", err)
+                continue
+            if (digest := body_digest(body)) == last_digest:
+                continue
+            last_digest = digest
+            trace.write(json.dumps(asdict(entry), separators=(",", ":")) + "\n")
+            trace.flush()
+            recorded += 1
+    return recorded
+
+
+def mutate_feed(feed: dict[str, Any], rng: random.Random, now: datetime) -> None:
+    """Apply a plausible set of changes to a feed in place."""
+    stamp = now.strftime("%Y-%m-%dT%H:%M:%S-0000")
+    feed["LastUpdate"] = stamp
+    for resort in feed.get("Resorts", []):
+        if rng.random() < 0.5:
+            continue
+        resort["LastUpdate"] = stamp
+        snow_report = resort.setdefault("SnowReport", {})
+        snow_report["LastUpdate"] = stamp
+        if rng.random() < 0.1:
+            fresh = rng.randint(1, 4)
+            for key in ("SeasonTotalIn", "StormTotalIn"):
+                try:
+                    snow_report[key] = str(int(snow_report.get(key, "0")) + fresh)
+                except ValueError:
+                    snow_report[key] = str(fresh)
+        for area in resort.get("MountainAreas", []):
+            for kind in ("Trails", "Lifts", "Activities"):
+                for item in area.get(kind, []):
+                    if rng.random() < 0.05:
+                        item["StatusEnglish"] = rng.choice(_STATUSES)
+        for conditions in (resort.get("CurrentConditions") or {}).values():
+            if isinstance(conditions, dict):
+                temperature = conditions.get("TemperatureC", "0")
+                try:
+                    drift = int(temperature) + rng.randint(-1, 1)
+                except ValueError:
+                    drift = 0
+                conditions["TemperatureC"] = str(drift)
+
+
+def synthesize_trace(
+    feed: dict[str, Any], cycles: int, seed: int = 0
+) -> Iterator[TraceEntry]:
+    """Yield one entry per refresh interval by mutating a copy of feed."""
+    rng = random.Random(seed)
+    feed = copy.deepcopy(feed)
+    start = datetime(2025, 11, 24, 6, 0)
+    body = etag = None
+    for cycle in range(cycles):
+        now = start + timedelta(seconds=cycle * DEFAULT_SCAN_INTERVAL)
+        # Roughly one in four refreshes sees an unchanged feed
+        if body is not None and rng.random() < 0.25:
+            yield TraceEntry(cycle * DEFAULT_SCAN_INTERVAL, body, etag)
+            continue
+        mutate_feed(feed, rng, now)
+        body = json.dumps(feed, separators=(",", ":"))
+        etag = f'"{body_digest(body)}"'
+        yield TraceEntry(
+            cycle * DEFAULT_SCAN_INTERVAL,
+            body,
+            etag,
+            now.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        )
+
+
+class ReplayClient:
+    """Drop-in replacement for FeedClient serving responses from a trace.
+
+    Every fetch consumes one entry; an entry whose ETag matches the previous
+    one is reported as unchanged, as the HEAD check would for the live feed.
+    """
+
+    def __init__(self, entries: Iterable[TraceEntry]) -> None:
+        """Initialize the client."""
+        self._entries = iter(entries)
+        self.pool = ValuePool()
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self._stats = dict.fromkeys(CLIENT_STATS, 0)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Return the request counters of the replay."""
+        return dict(self._stats)
+
+    async def async_fetch(self) -> FetchResult | None:
+        """Return the next trace entry, or None when it is unchanged."""
+        entry = next(self._entries, None)
+        if entry is None:
+            raise FeedError("Trace exhausted")
+        self._stats["requests_today"] += 1
+        if entry.etag and entry.etag == self.etag:
+            self._stats["no_updates_today"] += 1
+            return None
+        self._stats["requests_today"] += 1
+        self._stats["updates_today"] += 1
+        size = len(entry.body.encode())
+        self._stats["bytes_received_today"] += size
+        self._stats["bytes_decompressed_today"] += size
+        data = decode_feed(entry.body)
+        self.etag = entry.etag
+        self.last_modified = entry.last_modified
+        return FetchResult(
+            data, entry.etag, entry.last_modified, body_digest(entry.body)
+        )
+
+
+def _rss_kb() -> int:
+    """Return the resident set size of this process in KiB."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() // 1024
+    except OSError:
+        # Peak rather than current RSS, but still shows growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass(slots=True)
+class SoakReport:
+    """Per-cycle measurements of a soak run."""
+
+    latencies: list[float] = field(default_factory=list)
+    entity_writes: list[int] = field(default_factory=list)
+    rss_start_kb: int = 0
+    rss_end_kb: int = 0
+    traced_start: int = 0
+    traced_end: int = 0
+    traced_peak: int = 0
+
+    def summary(self) -> str:
+        """Return a human readable summary."""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return "no cycles"
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return (
+            f"{len(latencies)} cycles: latency median "
+            f"{statistics.median(latencies) * 1000:.2f}ms p95 {p95 * 1000:.2f}ms "
+            f"max {latencies[-1] * 1000:.2f}ms; entity writes "
+            f"{sum(self.entity_writes)} ({max(self.entity_writes)} max/cycle); "
+            f"RSS {self.rss_start_kb} -> {self.rss_end_kb} KiB; traced "
+            f"{self.traced_start} -> {self.traced_end} B "
+            f"(peak {self.traced_peak} B)"
+        )
+
+
+async def async_run_soak(
+    refresh: Callable[[], Awaitable[Any]],
+    cycles: int,
+    count_writes: Callable[[], int],
+    warmup: int = 10,
+) -> SoakReport:
+    """Run refresh cycles back to back and measure latency and memory growth.
+
+    Memory baselines are taken after the warmup cycles so caches that fill
+    once are not reported as growth.
+    """
+    report = SoakReport()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        for cycle in range(cycles):
+            if cycle == min(warmup, cycles - 1):
+                report.rss_start_kb = _rss_kb()
+                report.traced_start = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            writes = count_writes()
+            start = time.perf_counter()
+            await refresh()
+            report.latencies.append(time.perf_counter() - start)
+            report.entity_writes.append(count_writes() - writes)
+        report.rss_end_kb = _rss_kb()
+        report.traced_end, report.traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Record or synthesize a trace from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="record the live feed")
+    record.add_argument("output")
+    record.add_argument("--count", type=int, default=288)
+    record.add_argument("--interval", type=float, default=DEFAULT_SCAN_INTERVAL)
+    synthesize = commands.add_parser("synthesize", help="mutate a sample feed")
+    synthesize.add_argument("feed")
+    synthesize.add_argument("output")
+    synthesize.add_argument("--cycles", type=int, default=1000)
+    synthesize.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+
+        async def _record() -> int:
+            async with aiohttp.ClientSession() as session:
+                return await async_record_trace(
+                    session, args.output, args.count, args.interval
+                )
+
+        written = asyncio.run(_record())
+    else:
+        with open(args.feed, encoding="utf-8") as feed:
+            sample = json.load(feed)
+        written = write_trace(
+            args.output, synthesize_trace(sample, args.cycles, args.seed)
+        )
+    print(f"Wrote {written} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
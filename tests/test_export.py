@@ -0,0 +1,72 @@
+"""Test the bulk snapshot export."""
+
+import json
+from types import SimpleNamespace
+
+from custom_components.mtnpowder.export import (
+    build_export,
+    encode_json,
+    etag_matches,
+    iter_ndjson,
+)
+from custom_components.mtnpowder.feed import RecordFilter, normalize_feed
+
+
+def _coordinator(feed, mountains):
+    return SimpleNamespace(data=normalize_feed(feed, version="v1"), mountains=mountains)
+
+
+def test_build_export_selection(synthetic_feed):
+    """Test the entry selection is the default and All selects everything."""
+    feed = synthetic_feed(resorts=3, areas=1, trails=2, lifts=1, activities=1)
+
+    export = build_export(_coordinator(feed, ["Resort 1"]), None, "json")
+    assert [resort.name for resort in export.resorts] == ["Resort 1"]
+
+    export = build_export(_coordinator(feed, ["All"]), None, "json")
+    assert len(export.resorts) == 3
+
+    export = build_export(
+        _coordinator(feed, ["Resort 1"]), ["Resort 2", "Missing"], "json"
+    )
+    assert [resort.name for resort in export.resorts] == ["Resort 2"]
+
+
+def test_export_etag(synthetic_feed):
+    """Test the ETag only changes with the snapshot, selection or format."""
+    feed = synthetic_feed(resorts=2, areas=1, trails=2, lifts=1, activities=1)
+    coordinator = _coordinator(feed, ["Resort 0"])
+
+    etag = build_export(coordinator, None, "json").etag
+    assert build_export(coordinator, None, "json").etag == etag
+    assert build_export(coordinator, None, "ndjson").etag != etag
+    assert build_export(coordinator, ["Resort 1"], "json").etag != etag
+    coordinator.data.version = "v2"
+    assert build_export(coordinator, None, "json").etag != etag
+
+    # A watchlist change alters the exported records of the same feed body
+    filtered = SimpleNamespace(
+        data=normalize_feed(
+            feed, "v1", RecordFilter.from_options({"categories": ["trail"]})
+        ),
+        mountains=["Resort 0"],
+    )
+    assert build_export(filtered, None, "json").etag != etag
+
+    assert etag_matches(f'W/"x", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+
+
+def test_export_encodings(sample_feed):
+    """Test compact JSON and NDJSON output."""
+    export = build_export(_coordinator(sample_feed, ["Stratton"]), None, "json")
+
+    document = json.loads(encode_json(export))
+    assert document["version"] == "v1"
+    records = document["resorts"][0]["records"]
+    assert records["trail/Test Area/Test Trail"]["StatusEnglish"] == "open"
+
+    lines = list(iter_ndjson(export))
+    assert len(lines) == 1 and lines[0].endswith(b"\n")
+    assert json.loads(lines[0])["name"] == "Stratton"
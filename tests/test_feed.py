@@ -0,0 +1,566 @@
+"""Test the Home Assistant independent feed client and parser."""
+
+import asyncio
+import copy
+from datetime import datetime, timezone
+import gzip
+from itertools import pairwise
+import json
+
+import pytest
+
+from custom_components.mtnpowder.const import DEFAULT_SCAN_INTERVAL
+from custom_components.mtnpowder.feed import (
+    BreakerState,
+    CircuitBreaker,
+    FeedClient,
+    FeedError,
+    RecordFilter,
+    ValuePool,
+    build_forecast,
+    conditions_attributes,
+    decode_feed,
+    diff_snapshots,
+    fingerprint,
+    normalize_feed,
+    parse_float,
+    parse_number,
+    parse_retry_after,
+    parse_timestamp,
+    rank_resorts,
+    ranking_source,
+    record_attributes,
+    record_state,
+    resort_delta,
+    truncate_state,
+)
+from custom_components.mtnpowder.profiling import CycleProfiler, PhaseTimer
+
+
+class FakeContent:
+    """Stream reader yielding a body in small chunks."""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), 7):
+            yield self._body[start : start + 7]
+
+
+class FakeResponse:
+    """Minimal stand-in for an aiohttp response."""
+
+    def __init__(self, status=200, headers=None, body=""):
+        self.status = status
+        self.headers = headers or {}
+        self.content = FakeContent(body.encode() if isinstance(body, str) else body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Session returning queued responses and recording requests."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def _request(self, method):
+        self.requests.append(method)
+        return self.responses.pop(0)
+
+    def head(self, url, **kwargs):
+        return self._request("HEAD")
+
+    def get(self, url, **kwargs):
+        self.request_headers = kwargs.get("headers")
+        return self._request("GET")
+
+
+def test_decode_feed_rejects_invalid_json():
+    """Test decoding errors are reported as FeedError."""
+    with pytest.raises(FeedError):
+        decode_feed("{not json")
+    with pytest.raises(FeedError):
+        decode_feed("[]")
+
+
+def test_normalize_feed_indexes_records(sample_feed):
+    """Test every record is indexed by its sensor key."""
+    snapshot = normalize_feed(sample_feed)
+    resort = snapshot.resorts["Stratton"]
+
+    assert resort.get(("resort",))["OperatingStatus"] == "Closed"
+    assert resort.get(("snow_report",))["SeasonTotalIn"] == "14"
+    assert "Trails" not in resort.get(("area", "Test Area"))
+    assert resort.get(("trail", "Test Area", "Test Trail"))["Difficulty"] == "Easy"
+    assert resort.get(("lift", "Test Area", "Test Lift")) is not None
+    assert resort.get(("activity", "Test Area", "Test Activity")) is not None
+    assert resort.keys("conditions") == [("conditions", "Base")]
+    assert resort.get(("forecast",))["OneDay"]["date"] == "2025-11-25"
+
+
+def test_diff_snapshots(sample_feed):
+    """Test added, changed and removed records are reported per resort."""
+    old = normalize_feed(sample_feed)
+    assert diff_snapshots(old, normalize_feed(sample_feed)) == {}
+
+    changed = copy.deepcopy(sample_feed)
+    area = changed["Resorts"][0]["MountainAreas"][0]
+    area["Trails"][0]["StatusEnglish"] = "closed"
+    area["Lifts"].append({"Name": "New Lift", "StatusEnglish": "open"})
+    del area["Activities"]
+
+    diff = diff_snapshots(old, normalize_feed(changed))["Stratton"]
+    assert diff.changed == {("trail", "Test Area", "Test Trail")}
+    assert diff.added == {("lift", "Test Area", "New Lift")}
+    assert diff.removed == {("activity", "Test Area", "Test Activity")}
+
+    assert set(diff_snapshots(None, old)["Stratton"].added) == set(
+        old.resorts["Stratton"].records
+    )
+
+
+def test_record_state_and_attributes(sample_feed):
+    """Test state and attribute extraction for each record kind."""
+    resort = normalize_feed(sample_feed).resorts["Stratton"]
+    area = resort.get(("area", "Test Area"))
+    trail = resort.get(("trail", "Test Area", "Test Trail"))
+    lift = resort.get(("lift", "Test Area", "Test Lift"))
+
+    assert record_state("area", area) == 5
+    assert record_attributes("area", area)["total_trails_count"] == 10
+    assert record_state("trail", trail) == "open"
+    assert record_attributes("trail", trail)["difficulty"] == "Easy"
+    assert record_state("lift", lift) == "closed"
+    assert "StatusEnglish" not in record_attributes("lift", lift)
+    assert record_state("lift", {}) == "unknown"
+
+
+def test_value_helpers():
+    """Test truncation and numeric parsing helpers."""
+    assert truncate_state("x" * 300) == "x" * 252 + "..."
+    assert truncate_state(5) == 5
+    assert parse_float("--") is None
+    assert parse_float("1013") == 1013.0
+    assert parse_float("n/a") is None
+
+
+def test_weather_extraction(sample_feed):
+    """Test weather attributes and forecast building."""
+    resort = normalize_feed(sample_feed).resorts["Stratton"]
+    conditions = resort.get(("conditions", "Base"))
+
+    assert conditions_attributes(conditions) == {"Humidity": "60", "Skies": "Clear"}
+    forecast = build_forecast(resort.get(("forecast",)), conditions)
+    assert [item["temperature"] for item in forecast] == [20.0, 10.0]
+    assert build_forecast({}, conditions) is None
+
+
+def test_client_skips_unchanged_feed(sample_feed):
+    """Test the client only downloads when the validators change."""
+    body = json.dumps(sample_feed)
+    session = FakeSession(
+        FakeResponse(headers={"ETag": "a"}),
+        FakeResponse(headers={"ETag": "a"}, body=body),
+        FakeResponse(headers={"ETag": "a"}),
+    )
+    client = FeedClient(session)
+
+    result = asyncio.run(client.async_fetch())
+    assert result.data == sample_feed
+    assert result.etag == "a"
+    assert asyncio.run(client.async_fetch()) is None
+    assert session.requests == ["HEAD", "GET", "HEAD"]
+    stats = client.stats
+    assert stats["updates_today"] == 1
+    assert stats["no_updates_today"] == 1
+    assert stats["requests_today"] == 3
+    assert stats["bytes_received_today"] == len(body)
+
+
+def test_client_streams_compressed_body(sample_feed):
+    """Test gzip bodies are decompressed and both byte counts are tracked."""
+    body = json.dumps(sample_feed).encode()
+    compressed = gzip.compress(body)
+    session = FakeSession(
+        FakeResponse(headers={"ETag": "a"}),
+        FakeResponse(
+            headers={"ETag": "a", "Content-Encoding": "gzip"}, body=compressed
+        ),
+    )
+    client = FeedClient(session)
+
+    result = asyncio.run(client.async_fetch())
+    assert result.data == sample_feed
+    assert "gzip" in session.request_headers["Accept-Encoding"]
+    assert client.stats["bytes_received_today"] == len(compressed)
+    assert client.stats["bytes_decompressed_today"] == len(body)
+
+
+def test_client_rejects_unknown_encoding():
+    """Test bodies in an unsupported encoding raise FeedError."""
+    session = FakeSession(
+        FakeResponse(headers={"ETag": "a"}),
+        FakeResponse(headers={"Content-Encoding": "zstd"}, body=b"\x00"),
+    )
+
+    with pytest.raises(FeedError):
+        asyncio.run(FeedClient(session).async_fetch())
+
+
+def test_client_keeps_validators_on_bad_body():
+    """Test a body that fails to decode is downloaded again next time."""
+    session = FakeSession(
+        FakeResponse(headers={"ETag": "a"}),
+        FakeResponse(headers={"ETag": "a"}, body="{broken"),
+    )
+    client = FeedClient(session)
+
+    with pytest.raises(FeedError):
+        asyncio.run(client.async_fetch())
+    assert client.etag is None
+
+
+def test_client_reports_head_failure():
+    """Test HTTP errors are raised as FeedError."""
+    client = FeedClient(
+        FakeSession(FakeResponse(status=503, headers={"Retry-After": "120"}))
+    )
+
+    with pytest.raises(FeedError) as exc_info:
+        asyncio.run(client.async_fetch())
+    assert exc_info.value.status == 503
+    assert exc_info.value.retry_after == 120
+    assert client.stats["no_updates_today"] == 1
+
+
+def test_parse_retry_after():
+    """Test Retry-After is parsed as seconds or as an HTTP date."""
+    now = datetime(2025, 11, 24, 12, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("30") == 30
+    assert parse_retry_after("Mon, 24 Nov 2025 12:02:00 GMT", now) == 120
+    assert parse_retry_after("Mon, 24 Nov 2025 11:00:00 GMT", now) == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_circuit_breaker_backoff():
+    """Test the breaker opens, backs off exponentially and recovers."""
+    now = 1000.0
+    breaker = CircuitBreaker(
+        failure_threshold=2,
+        base_delay=100,
+        max_delay=350,
+        clock=lambda: now,
+        rng=lambda: 1.0,
+    )
+    breaker.record_failure(FeedError("down"))
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.allow()
+
+    breaker.record_failure(FeedError("down"))
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.next_attempt == 1200
+    assert not breaker.allow()
+
+    now = 1200.0
+    assert breaker.allow()
+    assert breaker.state is BreakerState.HALF_OPEN
+    breaker.record_failure(FeedError("down"))
+    assert breaker.next_attempt == 1600
+
+    now = 1600.0
+    assert breaker.allow()
+    breaker.record_failure(FeedError("down"))
+    assert breaker.next_attempt == 2300
+    assert breaker.as_dict()["state"] == "open"
+
+    now = 2300.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.as_dict()["next_attempt"] is None
+
+
+@pytest.mark.parametrize("jitter", [0.0, 0.5, 0.999])
+def test_circuit_breaker_at_poll_interval(jitter):
+    """Test polling a dead feed at the scan interval skips polls once open."""
+    now = 0.0
+    breaker = CircuitBreaker(
+        base_delay=DEFAULT_SCAN_INTERVAL, clock=lambda: now, rng=lambda: jitter
+    )
+    requests = []
+    for poll in range(24):
+        now = poll * DEFAULT_SCAN_INTERVAL
+        if breaker.allow():
+            requests.append(poll)
+            now += 1
+            breaker.record_failure(FeedError("down"))
+
+    assert requests[:3] == [0, 1, 2]
+    # The poll right after every opening is skipped
+    assert all(later - earlier >= 2 for earlier, later in pairwise(requests[2:]))
+    if jitter == 0.0:
+        assert requests == [0, 1, 2, 4, 7, 12, 21]
+
+
+def test_circuit_breaker_respects_retry_after():
+    """Test a Retry-After opens the breaker at once for at least that long."""
+    breaker = CircuitBreaker(clock=lambda: 0.0, rng=lambda: 0.0)
+    breaker.record_failure(FeedError("busy", 429, retry_after=900))
+
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.next_attempt == 900
+
+
+def test_parse_number():
+    """Test snow report numbers, including ranges, are parsed."""
+    assert parse_number("14") == 14.0
+    assert parse_number("18-24") == 18.0
+    assert parse_number("--") is None
+    assert parse_number(None) is None
+
+
+def test_parse_timestamp():
+    """Test feed timestamps with compact UTC offsets are parsed."""
+    parsed = parse_timestamp("2025-11-24T17:42:17-0500")
+    assert parsed.utcoffset().total_seconds() == -5 * 3600
+    assert parse_timestamp("2025-11-24T17:42:17").tzinfo is not None
+    assert parse_timestamp("--") is None
+    assert parse_timestamp(None) is None
+
+
+def test_resort_delta(sample_feed):
+    """Test deltas only carry the records that were touched."""
+    old = normalize_feed(sample_feed)
+    changed = copy.deepcopy(sample_feed)
+    area = changed["Resorts"][0]["MountainAreas"][0]
+    area["Trails"][0]["StatusEnglish"] = "closed"
+    del area["Activities"]
+    new = normalize_feed(changed)
+
+    diff = diff_snapshots(old, new)["Stratton"]
+    delta = resort_delta(new.resorts["Stratton"], diff)
+    assert delta == {
+        "changed": {
+            "trail/Test Area/Test Trail": {
+                "Name": "Test Trail",
+                "StatusEnglish": "closed",
+                "Difficulty": "Easy",
+            }
+        },
+        "removed": ["activity/Test Area/Test Activity"],
+    }
+
+
+def test_client_streams_brotli_body(sample_feed):
+    """Test brotli bodies are decompressed when brotli is installed."""
+    brotli = pytest.importorskip("brotli")
+    body = json.dumps(sample_feed).encode()
+    session = FakeSession(
+        FakeResponse(headers={"ETag": "a"}),
+        FakeResponse(
+            headers={"ETag": "a", "Content-Encoding": "br"},
+            body=brotli.compress(body),
+        ),
+    )
+
+    assert asyncio.run(FeedClient(session).async_fetch()).data == sample_feed
+
+
+def test_record_filter_watchlist(synthetic_feed):
+    """Test records outside the watchlist are never indexed or diffed."""
+    feed = synthetic_feed(resorts=1, areas=2, trails=8, lifts=3, activities=2)
+    record_filter = RecordFilter.from_options(
+        {
+            "include": "trail 0-*, area 1/lift*",
+            "exclude": ["*-7"],
+            "difficulties": "expert, Beginner",
+            "categories": ["trail", "lift"],
+        }
+    )
+    resort = normalize_feed(feed, record_filter=record_filter).resorts["Resort 0"]
+
+    assert resort.keys("trail") == [
+        ("trail", "Area 0", "Trail 0-0"),
+        ("trail", "Area 0", "Trail 0-3"),
+        ("trail", "Area 0", "Trail 0-4"),
+    ]
+    assert resort.keys("lift") == [
+        ("lift", "Area 1", f"Lift 1-{lift}") for lift in range(3)
+    ]
+    assert resort.keys("activity") == []
+    assert resort.get(("area", "Area 1")) is not None
+
+    changed = copy.deepcopy(feed)
+    changed["Resorts"][0]["MountainAreas"][0]["Trails"][1]["StatusEnglish"] = "Hold"
+    new = normalize_feed(changed, record_filter=record_filter)
+    assert diff_snapshots(normalize_feed(feed, record_filter=record_filter), new) == {}
+
+    # Excluded areas are not indexed either, so they get no area sensors
+    area_filter = RecordFilter.from_options({"areas": "area 1"})
+    resort = normalize_feed(feed, record_filter=area_filter).resorts["Resort 0"]
+    assert resort.keys("area") == [("area", "Area 1")]
+    assert {key[1] for key in resort.keys("trail")} == {"Area 1"}
+
+
+def test_record_filter_from_empty_options():
+    """Test no filter is built when nothing limits the records."""
+    assert RecordFilter.from_options({}) is None
+    assert (
+        RecordFilter.from_options(
+            {"include": "", "categories": ["trail", "lift", "activity"]}
+        )
+        is None
+    )
+    area_filter = RecordFilter.from_options({"areas": "Summit"})
+    assert area_filter.matches("lift", "summit", {"Name": "Gondola"})
+    assert not area_filter.matches("lift", "Base", {"Name": "Gondola"})
+
+
+def test_rank_resorts(synthetic_feed):
+    """Test bounded rankings over the feed in one pass."""
+    feed = synthetic_feed(resorts=40, areas=1, trails=1, lifts=1, activities=1)
+    rankings = rank_resorts(feed["Resorts"], 3)
+
+    assert [entry["resort"] for entry in rankings["open_terrain"]] == [
+        "Resort 39",
+        "Resort 38",
+        "Resort 37",
+    ]
+    assert rankings["open_terrain"][0]["value"] == 390
+    # Ties keep feed order
+    assert [entry["resort"] for entry in rankings["new_snow"]] == [
+        "Resort 6",
+        "Resort 13",
+        "Resort 20",
+    ]
+    assert rankings["coldest_summit"][0] == {
+        "resort": "Resort 39",
+        "value": -39,
+        "station": "Summit",
+    }
+
+    selected = rank_resorts(feed["Resorts"], 5, {"Resort 1", "Resort 2"})
+    assert [entry["resort"] for entry in selected["open_terrain"]] == [
+        "Resort 2",
+        "Resort 1",
+    ]
+
+
+def test_rank_resorts_without_summit(sample_feed):
+    """Test the coldest station is used when a resort reports no summit."""
+    rankings = rank_resorts(sample_feed["Resorts"], 5)
+
+    assert rankings["coldest_summit"] == [
+        {"resort": "Stratton", "value": 5.0, "station": "Base"}
+    ]
+    assert rankings["new_snow"] == []
+
+
+def test_client_times_decode(sample_feed):
+    """Test the client reports JSON decoding as its own phase."""
+    timer = PhaseTimer()
+    session = FakeSession(
+        FakeResponse(headers={"ETag": "a"}),
+        FakeResponse(headers={"ETag": "a"}, body=json.dumps(sample_feed)),
+    )
+    asyncio.run(FeedClient(session, timer=timer).async_fetch())
+
+    assert timer.as_dict()["decode"]["count"] == 1
+
+
+def test_client_profiles_from_decode(sample_feed, tmp_path):
+    """Test the profiler is off while the body streams in and on for decoding."""
+    profiler = CycleProfiler(1, str(tmp_path / "fetch.prof"))
+    response = FakeResponse(headers={"ETag": "a"}, body=json.dumps(sample_feed))
+    chunks = response.content.iter_chunked
+    streaming = []
+
+    async def iter_chunked(size):
+        async for chunk in chunks(size):
+            streaming.append(profiler.active)
+            yield chunk
+
+    response.content.iter_chunked = iter_chunked
+    client = FeedClient(FakeSession(FakeResponse(headers={"ETag": "a"}), response))
+    client.profiler = profiler
+    asyncio.run(client.async_fetch())
+
+    assert streaming and not any(streaming)
+    assert profiler.active
+    profiler.stop()
+
+
+def test_record_fingerprints(sample_feed):
+    """Test records carry fingerprints that only change with their content."""
+    resort = normalize_feed(sample_feed).resorts["Stratton"]
+    key = ("trail", "Test Area", "Test Trail")
+
+    assert resort.fingerprints.keys() == resort.records.keys()
+    assert resort.fingerprint(key) == fingerprint(dict(resort.get(key)))
+    assert resort.fingerprint(key) != fingerprint({**resort.get(key), "Grooming": "1"})
+    assert resort.fingerprint(("missing",)) is None
+    assert fingerprint({"a": [1, {"b": 2}]}) == fingerprint({"a": [1, {"b": 2}]})
+
+
+def test_fingerprint_sees_hash_collisions(sample_feed):
+    """Test changes between values that collide under hash() are diffed."""
+    assert hash(-1) == hash(-2)
+    assert fingerprint({"a": -1}) != fingerprint({"a": -2})
+    assert fingerprint({"a": 1}) != fingerprint({"a": True})
+
+    sample_feed["Resorts"][0]["MountainAreas"][0]["OpenTrailsCount"] = -1
+    old = normalize_feed(sample_feed)
+    sample_feed["Resorts"][0]["MountainAreas"][0]["OpenTrailsCount"] = -2
+    diff = diff_snapshots(old, normalize_feed(sample_feed))["Stratton"]
+
+    assert diff.changed == {("area", "Test Area")}
+
+
+def test_normalize_shares_pooled_values(sample_feed):
+    """Test low-cardinality values share one object across snapshots."""
+    body = json.dumps(sample_feed)
+    pool = ValuePool()
+    first = normalize_feed(decode_feed(body), pool=pool).resorts["Stratton"]
+    second = normalize_feed(decode_feed(body), pool=pool).resorts["Stratton"]
+    key = ("trail", "Test Area", "Test Trail")
+
+    assert first.get(key)["Difficulty"] is second.get(key)["Difficulty"]
+    assert first.name is second.name
+    plain = normalize_feed(decode_feed(body)).resorts["Stratton"]
+    assert plain.get(key)["Difficulty"] is not first.get(key)["Difficulty"]
+    # Timestamps change every refresh and are never pooled
+    assert (
+        first.get(("snow_report",))["LastUpdate"]
+        is not second.get(("snow_report",))["LastUpdate"]
+    )
+
+
+def test_value_pool_is_bounded():
+    """Test the pool stops taking values once full."""
+    pool = ValuePool(max_size=2)
+    pool.share({"StatusEnglish": "Open"})
+    pool.share({"StatusEnglish": "Closed"})
+    hold = "".join(["Ho", "ld"])
+    opened = "".join(["Op", "en"])
+
+    assert pool.share({"StatusEnglish": hold})["StatusEnglish"] is hold
+    assert len(pool) == 2
+    assert pool.share({"StatusEnglish": opened})["StatusEnglish"] is not opened
+
+
+def test_ranking_source_matches_feed(synthetic_feed):
+    """Test rankings rebuilt from a snapshot match those of the raw feed."""
+    feed = synthetic_feed(resorts=10, areas=1, trails=1, lifts=1, activities=1)
+    snapshot = normalize_feed(feed)
+
+    assert rank_resorts(
+        [ranking_source(resort) for resort in snapshot.resorts.values()], 3
+    ) == rank_resorts(feed["Resorts"], 3)
@@ -0,0 +1,175 @@
+"""Micro-benchmarks for the feed parser.
+
+These run as plain pytest tests. Timings are printed (use ``pytest -s``) and
+only compared relative to each other so they stay stable on slow CI runners.
+"""
+
+import copy
+import json
+import time
+import tracemalloc
+
+from custom_components.mtnpowder.feed import (
+    RECORD_KINDS,
+    ValuePool,
+    decode_feed,
+    diff_snapshots,
+    normalize_feed,
+    parse_number,
+    rank_resorts,
+    record_attributes,
+    record_state,
+)
+
+
+def _best_of(func, rounds=5):
+    """Return the fastest wall time of several runs of func."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _allocations(func):
+    """Return the number of memory blocks func allocates and keeps alive."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = func()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    return sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+
+def _retained_bytes(func):
+    """Return the traced memory still held by the result of func."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained
+
+
+def test_benchmark_decode_normalize_diff(synthetic_feed):
+    """Benchmark the full parse pipeline on a 40 resort feed."""
+    body = json.dumps(synthetic_feed())
+    previous = normalize_feed(decode_feed(body))
+
+    decode = _best_of(lambda: decode_feed(body))
+    normalize = _best_of(lambda: normalize_feed(decode_feed(body)))
+    diff = _best_of(lambda: diff_snapshots(previous, normalize_feed(decode_feed(body))))
+    print(f"\ndecode {decode:.4f}s normalize {normalize:.4f}s diff {diff:.4f}s")
+
+    assert diff_snapshots(previous, normalize_feed(decode_feed(body))) == {}
+
+
+def test_benchmark_indexed_lookup(synthetic_feed):
+    """Benchmark indexed record lookups against scanning the raw feed."""
+    feed = synthetic_feed(resorts=40, areas=4, trails=50)
+    snapshot = normalize_feed(feed)
+    targets = [
+        (f"Resort {r}", f"Area {a}", f"Trail {a}-{t}")
+        for r in range(0, 40, 7)
+        for a in range(4)
+        for t in range(0, 50, 5)
+    ]
+
+    def scan():
+        for mountain, area_name, trail_name in targets:
+            resort = [i for i in feed["Resorts"] if i["Name"] == mountain][0]
+            area = next(a for a in resort["MountainAreas"] if a["Name"] == area_name)
+            trail = next(t for t in area["Trails"] if t["Name"] == trail_name)
+            record_attributes("trail", trail)
+
+    def indexed():
+        for mountain, area_name, trail_name in targets:
+            trail = snapshot.resorts[mountain].get(("trail", area_name, trail_name))
+            record_attributes("trail", trail)
+
+    scanned = _best_of(scan)
+    looked_up = _best_of(indexed)
+    print(f"\nscan {scanned:.4f}s indexed {looked_up:.4f}s")
+
+    assert looked_up < scanned
+
+
+def test_benchmark_rankings(synthetic_feed):
+    """Benchmark bounded rankings against sorting every resort."""
+    resorts = synthetic_feed(resorts=400, areas=1, trails=1, lifts=1)["Resorts"]
+
+    def sort_all():
+        return sorted(
+            resorts,
+            key=lambda resort: parse_number(resort["SnowReport"]["OpenTerrainAcres"]),
+            reverse=True,
+        )[:5]
+
+    ranked = _best_of(lambda: rank_resorts(resorts, 5))
+    sorted_all = _best_of(sort_all)
+    print(f"\nrank (3 rankings) {ranked:.4f}s sort (1 ranking) {sorted_all:.4f}s")
+
+    assert [entry["resort"] for entry in rank_resorts(resorts, 5)["open_terrain"]] == [
+        resort["Name"] for resort in sort_all()
+    ]
+
+
+def test_benchmark_fingerprint_skip(synthetic_feed):
+    """Measure entity renders of a refresh with and without fingerprints."""
+    feed = synthetic_feed(resorts=1, areas=8, trails=250, lifts=40, activities=20)
+    old = normalize_feed(feed).resorts["Resort 0"]
+    changed = copy.deepcopy(feed)
+    changed["Resorts"][0]["MountainAreas"][0]["Trails"][0]["StatusEnglish"] = "Hold"
+    new = normalize_feed(changed).resorts["Resort 0"]
+    keys = [key for key in new.records if key[0] in RECORD_KINDS]
+
+    def render(key):
+        record = new.get(key)
+        return record_state(key[0], record), record_attributes(key[0], record)
+
+    def rebuild_all():
+        return [render(key) for key in keys]
+
+    def skip_unchanged():
+        return [
+            render(key) for key in keys if new.fingerprint(key) != old.fingerprint(key)
+        ]
+
+    rebuilt = _allocations(rebuild_all)
+    skipped = _allocations(skip_unchanged)
+    print(
+        f"\n{len(keys)} records: rebuild {rebuilt} blocks, "
+        f"fingerprint skip {skipped} blocks, "
+        f"rebuild {_best_of(rebuild_all):.4f}s skip {_best_of(skip_unchanged):.4f}s"
+    )
+
+    assert len(skip_unchanged()) == 1
+    assert skipped < rebuilt
+
+
+def test_benchmark_pooled_snapshot_memory(synthetic_feed):
+    """Measure the memory a 40 resort snapshot retains with and without the pool."""
+    body = json.dumps(synthetic_feed())
+    pool = ValuePool()
+    # Steady state: the pool already holds the values of earlier snapshots
+    normalize_feed(decode_feed(body), pool=pool)
+
+    plain = _retained_bytes(lambda: normalize_feed(decode_feed(body)))
+    pooled = _retained_bytes(lambda: normalize_feed(decode_feed(body), pool=pool))
+    plain_time = _best_of(lambda: normalize_feed(decode_feed(body)))
+    pooled_time = _best_of(lambda: normalize_feed(decode_feed(body), pool=pool))
+    print(
+        f"\nretained plain {plain / 1024:.0f} KiB pooled {pooled / 1024:.0f} KiB "
+        f"(pool {len(pool)} values); "
+        f"decode+normalize plain {plain_time:.4f}s pooled {pooled_time:.4f}s"
+    )
+
+    assert pooled < plain
+    assert len(pool) <= pool.max_size
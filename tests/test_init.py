@@ -0,0 +1,287 @@
+"""Test the MtnPowder coordinator and entry lifecycle."""
+
+import asyncio
+import json
+import logging
+import pstats
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.mtnpowder.const import (
+    CONF_MOUNTAINS,
+    CONF_STALE_WHILE_REVALIDATE,
+    DOMAIN,
+)
+from custom_components.mtnpowder.feed import body_digest
+from homeassistant.helpers import device_registry as dr
+from soak import ReplayClient, TraceEntry
+
+
+class SlowReplayClient(ReplayClient):
+    """Replay client whose fetches wait on a gate, like a request in flight."""
+
+    def __init__(self, entries):
+        """Initialize the client with an open gate."""
+        super().__init__(entries)
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def async_fetch(self):
+        """Wait for the gate, then return the next trace entry."""
+        await self.gate.wait()
+        return await super().async_fetch()
+
+
+@pytest.mark.asyncio
+async def test_options_add_and_remove_resorts(
+    hass, enable_custom_integrations, synthetic_feed
+):
+    """Test resorts are added and removed in place from the loaded snapshot."""
+    body = json.dumps(
+        synthetic_feed(resorts=3, areas=1, trails=2, lifts=1, activities=1)
+    )
+    client = ReplayClient([TraceEntry(0, body, f'"{body_digest(body)}"')])
+    options = {CONF_STALE_WHILE_REVALIDATE: False}
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_MOUNTAINS: ["Resort 0", "Resort 1"]},
+        options=options,
+    )
+    entry.add_to_hass(hass)
+
+    with patch("custom_components.mtnpowder.FeedClient", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        requests = client.stats["requests_today"]
+        assert hass.states.get("sensor.resort_0_operating_status") is not None
+
+        hass.config_entries.async_update_entry(
+            entry, options={**options, CONF_MOUNTAINS: ["Resort 1", "Resort 2"]}
+        )
+        await hass.async_block_till_done()
+
+    # Same coordinator and no new fetch: the entry was not reloaded
+    assert hass.data[DOMAIN][entry.entry_id]["coordinator"] is coordinator
+    assert client.stats["requests_today"] == requests
+    assert coordinator.mountains == ["Resort 1", "Resort 2"]
+    # The previous delta is not sent to subscribers again
+    assert coordinator.changes == {}
+    assert hass.states.get("sensor.resort_0_operating_status") is None
+    assert hass.states.get("sensor.resort_2_operating_status") is not None
+
+    dev_reg = dr.async_get(hass)
+    assert dev_reg.async_get_device(identifiers={(DOMAIN, "Resort 0")}) is None
+    device = dev_reg.async_get_device(identifiers={(DOMAIN, "Resort 2")})
+    assert device.via_device_id is not None
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_revalidation_updates_listeners(
+    hass, enable_custom_integrations, synthetic_feed
+):
+    """Test an unchanged background fetch still refreshes the entities."""
+    body = json.dumps(
+        synthetic_feed(resorts=1, areas=1, trails=2, lifts=1, activities=1)
+    )
+    etag = f'"{body_digest(body)}"'
+    client = SlowReplayClient([TraceEntry(0, body, etag), TraceEntry(300, body, etag)])
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_MOUNTAINS: ["Resort 0"]})
+    entry.add_to_hass(hass)
+
+    with patch("custom_components.mtnpowder.FeedClient", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        fetched = coordinator.last_fetch_success
+        updates = []
+        unsub = coordinator.async_add_listener(
+            lambda: updates.append(coordinator.last_fetch_success)
+        )
+
+        client.gate.clear()
+        await coordinator.async_refresh()
+        # The stale snapshot is served while the fetch is in flight
+        assert updates == [fetched]
+
+        client.gate.set()
+        await hass.async_block_till_done(wait_background_tasks=True)
+        unsub()
+
+    assert client.stats["no_updates_today"] == 1
+    assert len(updates) == 2
+    assert updates[1] != fetched
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_profile_covers_revalidation(
+    hass, enable_custom_integrations, synthetic_feed, caplog
+):
+    """Test a stale-while-revalidate cycle ends after the background fetch."""
+    feed = synthetic_feed(resorts=1, areas=1, trails=2, lifts=1, activities=1)
+    first = json.dumps(feed)
+    feed["Resorts"][0]["MountainAreas"][0]["Trails"][0]["StatusEnglish"] = "Hold"
+    second = json.dumps(feed)
+    client = SlowReplayClient(
+        [
+            TraceEntry(0, first, f'"{body_digest(first)}"'),
+            TraceEntry(300, second, f'"{body_digest(second)}"'),
+        ]
+    )
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_MOUNTAINS: ["Resort 0"]})
+    entry.add_to_hass(hass)
+    caplog.set_level(logging.DEBUG, logger="custom_components.mtnpowder")
+
+    with patch("custom_components.mtnpowder.FeedClient", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        path = coordinator.async_start_profile(1)
+        caplog.clear()
+
+        client.gate.clear()
+        await coordinator.async_refresh()
+        # The stale fan-out does not end the cycle of the pending fetch, and
+        # nothing is profiled while waiting for the network
+        assert coordinator.profiler is not None
+        assert not coordinator.profiler.active
+        assert "Refresh phases" not in caplog.text
+
+        client.gate.set()
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert coordinator.profiler is None
+    assert coordinator.last_profile == path
+    phases = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Refresh phases")
+    ]
+    assert len(phases) == 1
+    for phase in ("fetch", "normalize", "diff", "fan_out"):
+        assert f"{phase} " in phases[0]
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert {"normalize_feed", "diff_resort", "_handle_coordinator_update"} <= functions
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_subscription_closed_on_unload(
+    hass, enable_custom_integrations, hass_ws_client, synthetic_feed
+):
+    """Test websocket subscriptions end when the entry is reloaded."""
+    body = json.dumps(
+        synthetic_feed(resorts=1, areas=1, trails=2, lifts=1, activities=1)
+    )
+    etag = f'"{body_digest(body)}"'
+    client = ReplayClient([TraceEntry(0, body, etag), TraceEntry(300, body, etag)])
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_MOUNTAINS: ["Resort 0"]},
+        options={CONF_STALE_WHILE_REVALIDATE: False},
+    )
+    entry.add_to_hass(hass)
+
+    with patch("custom_components.mtnpowder.FeedClient", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        ws_client = await hass_ws_client(hass)
+        await ws_client.send_json(
+            {"id": 1, "type": "mtnpowder/subscribe", "resort": "Resort 0"}
+        )
+        assert (await ws_client.receive_json())["success"]
+        assert "tree" in (await ws_client.receive_json())["event"]
+
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    msg = await ws_client.receive_json()
+    assert msg["id"] == 1
+    assert not msg["success"]
+    assert msg["error"]["code"] == "entry_unloaded"
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_releases_subscription(
+    hass, enable_custom_integrations, hass_ws_client, synthetic_feed
+):
+    """Test closed subscriptions leave nothing behind on the entry."""
+    body = json.dumps(
+        synthetic_feed(resorts=1, areas=1, trails=2, lifts=1, activities=1)
+    )
+    client = ReplayClient([TraceEntry(0, body, f'"{body_digest(body)}"')])
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_MOUNTAINS: ["Resort 0"]},
+        options={CONF_STALE_WHILE_REVALIDATE: False},
+    )
+    entry.add_to_hass(hass)
+
+    with patch("custom_components.mtnpowder.FeedClient", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    unload_callbacks = len(entry._on_unload or [])
+    ws_client = await hass_ws_client(hass)
+
+    for msg_id in range(1, 100, 2):
+        await ws_client.send_json(
+            {"id": msg_id, "type": "mtnpowder/subscribe", "resort": "Resort 0"}
+        )
+        assert (await ws_client.receive_json())["success"]
+        assert "tree" in (await ws_client.receive_json())["event"]
+        await ws_client.send_json(
+            {"id": msg_id + 1, "type": "unsubscribe_events", "subscription": msg_id}
+        )
+        assert (await ws_client.receive_json())["success"]
+
+    assert len(entry._on_unload or []) == unload_callbacks
+    assert not coordinator.subscriptions
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.mark.asyncio
+async def test_options_flow_selection_without_reload(
+    hass, enable_custom_integrations, synthetic_feed
+):
+    """Test the first options save of a new entry only changes the resorts."""
+    body = json.dumps(
+        synthetic_feed(resorts=3, areas=1, trails=2, lifts=1, activities=1)
+    )
+    entries = [TraceEntry(0, body, f'"{body_digest(body)}"')]
+    clients = []
+
+    def replay_client(*args, **kwargs):
+        clients.append(ReplayClient(entries))
+        return clients[-1]
+
+    with patch("custom_components.mtnpowder.FeedClient", side_effect=replay_client):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": "user"}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_MOUNTAINS: ["Resort 0", "Resort 1"]}
+        )
+        await hass.async_block_till_done()
+        entry = result["result"]
+        assert entry.title == "Resort 0, Resort 1"
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+        result = await hass.config_entries.options.async_init(entry.entry_id)
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {CONF_MOUNTAINS: ["Resort 1", "Resort 2"]}
+        )
+        await hass.async_block_till_done()
+
+    # The options flow stored every default, yet the entry was not reloaded
+    assert CONF_STALE_WHILE_REVALIDATE in entry.options
+    assert entry.title == "Resort 1, Resort 2"
+    assert hass.data[DOMAIN][entry.entry_id]["coordinator"] is coordinator
+    assert len(clients) == 2
+    assert hass.states.get("sensor.resort_2_operating_status") is not None
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,40 @@
+"""Test the refresh phase timer and cycle profiler."""
+
+import pstats
+
+from custom_components.mtnpowder.feed import normalize_feed
+from custom_components.mtnpowder.profiling import CycleProfiler, PhaseTimer
+
+
+def test_phase_timer_cycles():
+    """Test phases are totalled per cycle and summarized over cycles."""
+    timer = PhaseTimer()
+    for _ in range(2):
+        with timer.phase("fetch"), timer.phase("decode"):
+            pass
+        with timer.phase("fan_out"):
+            pass
+        assert set(timer.end_cycle()) == {"fetch", "decode", "fan_out"}
+
+    assert timer.end_cycle() == {}
+    summary = timer.as_dict()
+    assert summary["fetch"]["count"] == 2
+    assert summary["fetch"]["max_ms"] >= summary["decode"]["last_ms"] >= 0
+
+
+def test_cycle_profiler_dumps_after_cycles(tmp_path, synthetic_feed):
+    """Test the profiler covers the requested cycles and writes pstats."""
+    feed = synthetic_feed(resorts=2)
+    profiler = CycleProfiler(2, str(tmp_path / "refresh.prof"))
+
+    assert not profiler.end_cycle()
+    profiler.start()
+    normalize_feed(feed)
+    assert not profiler.end_cycle()
+    profiler.start()
+    normalize_feed(feed)
+    assert profiler.end_cycle()
+
+    profiler.dump()
+    stats = pstats.Stats(profiler.path)
+    assert any(func[2] == "normalize_feed" for func in stats.stats)
@@ -0,0 +1,95 @@
+"""Soak test replaying a feed trace through the coordinator and both platforms.
+
+The default run is short so it fits in CI. For an accelerated season long run
+set MTNPOWDER_SOAK_CYCLES (e.g. 5000), optionally MTNPOWDER_SOAK_TRACE to a
+recorded trace and MTNPOWDER_SOAK_RESORTS to a comma separated resort list,
+and run ``pytest tests/test_soak.py -s`` to see the report.
+"""
+
+import asyncio
+import os
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.mtnpowder.const import CONF_STALE_WHILE_REVALIDATE, DOMAIN
+from custom_components.mtnpowder.feed import FeedError
+from homeassistant.helpers.entity import Entity
+from soak import (
+    ReplayClient,
+    async_run_soak,
+    read_trace,
+    synthesize_trace,
+    write_trace,
+)
+
+SOAK_CYCLES = int(os.environ.get("MTNPOWDER_SOAK_CYCLES", "50"))
+SOAK_TRACE = os.environ.get("MTNPOWDER_SOAK_TRACE")
+SOAK_RESORTS = os.environ.get("MTNPOWDER_SOAK_RESORTS", "Stratton").split(",")
+
+
+def test_trace_round_trip(tmp_path, sample_feed):
+    """Test synthesized traces survive writing and reading."""
+    path = str(tmp_path / "trace.jsonl.gz")
+    entries = list(synthesize_trace(sample_feed, 20, seed=1))
+
+    assert write_trace(path, entries) == 20
+    assert list(read_trace(path)) == entries
+    assert len({entry.body for entry in entries}) > 1
+
+
+def test_replay_client(sample_feed):
+    """Test the replay client reports repeated ETags as unchanged."""
+    entries = list(synthesize_trace(sample_feed, 30, seed=2))
+    client = ReplayClient(entries)
+
+    async def fetch_all():
+        return [await client.async_fetch() for _ in entries]
+
+    results = asyncio.run(fetch_all())
+    unchanged = sum(result is None for result in results)
+    assert unchanged == client.stats["no_updates_today"]
+    assert results[0].data["Resorts"][0]["Name"] == "Stratton"
+    with pytest.raises(FeedError):
+        asyncio.run(client.async_fetch())
+
+
+@pytest.mark.asyncio
+async def test_soak_replay(hass, enable_custom_integrations, sample_feed):
+    """Replay a trace through the coordinator, sensors and weather entities."""
+    if SOAK_TRACE:
+        entries = read_trace(SOAK_TRACE)
+    else:
+        entries = synthesize_trace(sample_feed, SOAK_CYCLES + 1)
+    client = ReplayClient(entries)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"mountains": SOAK_RESORTS},
+        options={CONF_STALE_WHILE_REVALIDATE: False},
+    )
+    entry.add_to_hass(hass)
+
+    writes = 0
+    write_state = Entity.async_write_ha_state
+
+    def counting_write(self):
+        nonlocal writes
+        writes += 1
+        write_state(self)
+
+    with (
+        patch("custom_components.mtnpowder.FeedClient", return_value=client),
+        patch.object(Entity, "async_write_ha_state", counting_write),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        report = await async_run_soak(
+            coordinator.async_refresh, SOAK_CYCLES, lambda: writes
+        )
+
+    print(report.summary())
+    assert len(report.latencies) == SOAK_CYCLES
+    assert coordinator.last_update_success
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,84 @@
+"""Test hourly aggregation of snow history statistics."""
+
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+from custom_components.mtnpowder.feed import normalize_feed
+from custom_components.mtnpowder.statistics import SnowHistory, statistic_id
+
+
+def test_statistic_id():
+    """Test statistic ids are valid external statistic ids."""
+    assert statistic_id("Winter Park", "SeasonTotalIn") == (
+        "mtnpowder:winter_park_seasontotalin"
+    )
+
+
+def test_snow_history_batches_completed_hours(sample_feed):
+    """Test samples are aggregated per hour and written once the hour ends."""
+    snapshot = normalize_feed(sample_feed)
+    history = SnowHistory(Mock(), ["Stratton"])
+
+    with patch(
+        "custom_components.mtnpowder.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        history.async_add_snapshot(
+            snapshot, datetime(2025, 11, 24, 10, 5, tzinfo=timezone.utc)
+        )
+        sample_feed["Resorts"][0]["SnowReport"]["SeasonTotalIn"] = "16"
+        history.async_add_snapshot(
+            normalize_feed(sample_feed),
+            datetime(2025, 11, 24, 10, 35, tzinfo=timezone.utc),
+        )
+        add_statistics.assert_not_called()
+
+        history.async_add_snapshot(
+            snapshot, datetime(2025, 11, 24, 11, 0, tzinfo=timezone.utc)
+        )
+
+    calls = {
+        call.args[1]["statistic_id"]: call.args[2]
+        for call in add_statistics.call_args_list
+    }
+    season = calls["mtnpowder:stratton_seasontotalin"]
+    assert len(season) == 1
+    assert season[0]["start"] == datetime(2025, 11, 24, 10, tzinfo=timezone.utc)
+    assert (season[0]["min"], season[0]["max"], season[0]["mean"]) == (14, 16, 15)
+    assert "mtnpowder:stratton_openterrainacres" in calls
+
+
+def test_snow_history_unload_keeps_current_hour(sample_feed):
+    """Test unloading writes completed hours only, keeping the current one."""
+    history = SnowHistory(Mock(), ["Stratton"])
+
+    with (
+        patch(
+            "custom_components.mtnpowder.statistics.async_add_external_statistics"
+        ) as add_statistics,
+        patch(
+            "custom_components.mtnpowder.statistics.dt_util.utcnow",
+            return_value=datetime(2025, 11, 24, 10, 40, tzinfo=timezone.utc),
+        ),
+    ):
+        history.async_add_snapshot(
+            normalize_feed(sample_feed),
+            datetime(2025, 11, 24, 10, 5, tzinfo=timezone.utc),
+        )
+        history.async_flush_completed()
+        add_statistics.assert_not_called()
+
+        # The kept hour is written once, when the next hour starts
+        sample_feed["Resorts"][0]["SnowReport"]["SeasonTotalIn"] = "16"
+        history.async_add_snapshot(
+            normalize_feed(sample_feed),
+            datetime(2025, 11, 24, 11, 5, tzinfo=timezone.utc),
+        )
+
+    season = [
+        call.args[2]
+        for call in add_statistics.call_args_list
+        if call.args[1]["statistic_id"] == "mtnpowder:stratton_seasontotalin"
+    ]
+    assert len(season) == 1
+    assert season[0][0]["start"] == datetime(2025, 11, 24, 10, tzinfo=timezone.utc)
+    assert (season[0][0]["min"], season[0][0]["max"]) == (14, 14)